@@ -1,66 +1,399 @@
+from __future__ import annotations
+import os
+import json
+import hashlib
+import queue
+import threading
+from typing import Callable
 import spinarak
 import smeargle
 import porygon
 import rotom
 
-def main(defect: str, threshold: float, USE_LOCAL_STORAGE: bool, USE_RGB: bool, download_dataset: bool, verbose: bool = False, AI: porygon.models.Sequential | None = None,):
-    args = rotom.parse_JSON_as_arguments('config.json', defect,
-        [
-            "input_shape",
-            "dataset",
-            "num_classes",
-            "dimensions",
-            "roi",
-            "input_dir",
-            "debugging_dir",
-            "training_dir",
-            'queries'
-        ]
-    )
+STREAM_QUEUE_SIZE = 16
+STREAM_BATCH_SIZE = 32
+STREAM_BATCH_WAIT = 0.25
+STREAM_CV_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tif', '.tiff'}
+MANIFEST_NAME = 'manifest.jsonl'
+# Errors OpenCV, NumPy and debug writes raise on a malformed card; anything else is a bug and should surface
+ALIGN_ERRORS = (porygon.cv2.error, OSError, ValueError, IndexError)
+CONFIG_KEYS = [
+    "input_shape",
+    "dataset",
+    "num_classes",
+    "dimensions",
+    "roi",
+    "input_dir",
+    "debugging_dir",
+    "training_dir",
+    'queries',
+    'resolution',
+    'roi_template',
+    'detection_max_side',
+    'refine_corners',
+    'warp',
+    'card_template',
+    'gate',
+    'dedup'
+]
 
-    rotom.clear_terminal()
+def load_card(item: dict, args: dict, USE_LOCAL_STORAGE: bool) -> tuple[porygon.np.ndarray | None, str]:
+    """
+    Decode one downloaded card, consuming its 'image' bytes.
 
-    if not AI:
-        directoryCheck = rotom.directory_check(args.get("training_dir", ""))
-        attempts = 3
-        while not directoryCheck:
-            if attempts < 0:
-                exit()
-            args.update({
-                'training_dir': porygon.get_dataset(
-                    args.get("training_dir", ""),
-                    args['author'],
-                    args['dataset'],
-                    download_dataset,
-                    USE_LOCAL_STORAGE
-                )})
-            attempts -= 1
-            directoryCheck = rotom.directory_check(args.get("training_dir", ""))
-
-        images, labels, filenames = porygon.load_dataset_from_directory(args.get("training_dir", ""), args.get('input_shape', [128, 128]), USE_RGB)
-        if verbose: porygon.display_sample(images, labels, filenames)
-        new_images, new_labels = porygon.convert_and_reshape(images, labels)
-        training_images, testing_images, training_labels, testing_labels = porygon.split_dataset(new_images, new_labels)
-    
-        AI = porygon.build_model(args.get('num_classes', ''), USE_RGB)
-        porygon.train_model(AI, training_images, training_labels)
-        porygon.evaluate_model(AI, testing_images, testing_labels)
-        porygon.predict_and_visualize(AI, testing_images, testing_labels, USE_RGB, testing=True)
+    Args:
+        - item (dict): Card dictionary holding 'title', 'image_url' and, unless stored locally, 'image'.
+        - args (dict): Defect configuration parsed from config.json.
+        - USE_LOCAL_STORAGE (bool): Load the image from the image store instead of 'image'.
 
-    CLIENT_ID, CLIENT_SECRET = rotom.enviromentals('EBAY_CLIENT_ID', 'EBAY_CLIENT_SECRET')
+    Returns:
+    - tuple: (decoded image or None if unreadable or rejected by the defect's 'gate', debug directory)
+    """
+    if USE_LOCAL_STORAGE:
+        image, path = smeargle.load_file_from_directory(item['title'], args.get('input_dir', ''), args.get('debugging_dir', ''), item['image_url'], args.get('gate'))
+    else:
+        title = item.get('title', '') or 'no_title'
+        image, path = smeargle.load_file_from_bytearray(item.get('image', bytearray()), os.path.join(args.get('debugging_dir', ''), title[:40].replace(' ', '_').replace('/', '-')), args.get('gate'))
+    item.pop('image', None)
+    return image, path
 
-    rotom.print_with_color("Authenticating with eBay...", 4)
-    token = spinarak.get_ebay_token(CLIENT_ID, CLIENT_SECRET)
+def finish_card(item: dict, args: dict, roi: porygon.np.ndarray | None, status: str) -> porygon.np.ndarray | None:
+    """
+    Report the outcome of aligning a card and resize its ROI to the model input shape.
+    """
+    if roi is None:
+        rotom.print_with_color(f"Skipping '{item['title']}' — could not detect card corners.", 3)
+        return None
+    if status != "ok":
+        rotom.print_with_color(f"The ROI for '{item['title']}' may be weird. Reason: {status}", 3)
+    rotom.print_with_color(f"Finished Processing {item['title']}", 2)
+    return porygon.cv2.resize(roi, args.get('input_shape', [128, 128]))
 
-    items = []
+def reuse_verdict(item: dict, image: porygon.np.ndarray, duplicates: smeargle.DuplicateIndex | None, value: int | None = None) -> bool:
+    """
+    Hash a decoded card photo and, if it is a near-duplicate of an already classified one, copy that verdict onto the card.
+
+    Args:
+        - item (dict): Card dictionary to record the hash and any reused verdict on.
+        - image (np.ndarray): Decoded card photo.
+        - duplicates (DuplicateIndex): Index of classified photos, or None to skip the lookup.
+        - value (int): dHash of `image` if it is already known.
+
+    Returns:
+    - bool: True if the card needs no alignment or inference.
+    """
+    if duplicates is None:
+        return False
+    value = smeargle.dhash(image) if value is None else value
+    item['dhash'] = smeargle.hash_key(value)
+    match = duplicates.lookup(value)
+    if match is None:
+        return False
+    key, entry = match
+    item.update(entry['verdict'])
+    item['duplicate_of'] = key
+    rotom.print_with_color(f"Reusing the verdict of a near-duplicate photo for '{item['title']}'", 4)
+    return True
+
+def process_card(item: dict, args: dict, USE_LOCAL_STORAGE: bool, duplicates: smeargle.DuplicateIndex | None = None) -> tuple[porygon.np.ndarray | None, str]:
+    """
+    Decode, align and crop one downloaded card, consuming its 'image' bytes.
+
+    Args:
+        - item (dict): Card dictionary holding 'title', 'image_url' and, unless stored locally, 'image'.
+        - args (dict): Defect configuration parsed from config.json.
+        - USE_LOCAL_STORAGE (bool): Load the image from the image store instead of 'image'.
+        - duplicates (DuplicateIndex): Index of classified photos whose verdicts may be reused, or None.
+
+    Returns:
+    - tuple: (ROI resized to the model input shape, or None if the card was skipped or reused a verdict; status string)
+    """
+    rotom.print_with_color(f"Processing {item['title']}...", 4)
+    image, path = load_card(item, args, USE_LOCAL_STORAGE)
+    if image is None:
+        return None, "unreadable"
+    if reuse_verdict(item, image, duplicates):
+        smeargle.finish_debug(path, "ok")
+        return None, "duplicate"
+    roi, _, status = smeargle.process_image(image, args, path)
+    return finish_card(item, args, roi, status), status
+
+def process_cards(items: list[dict], args: dict, USE_LOCAL_STORAGE: bool, duplicates: smeargle.DuplicateIndex | None = None) -> tuple[list[dict], list]:
+    """
+    Decode the cards, aligning them and cropping their ROIs across a process pool.
+
+    Cards are decoded and aligned in runs of at most smeargle.SHARED_BATCH_BYTES of
+    decoded images, so memory stays bounded whatever the number of cards.
+    Cards that reuse the verdict of a near-duplicate photo in `duplicates` are not aligned.
+
+    Returns:
+    - tuple: (cards that produced an ROI, their resized ROIs), in input order.
+    """
+    processed, rois = [], []
+    loaded, images, paths = [], [], []
+    pending = [0]
+
+    def align() -> None:
+        rotom.print_with_color(f"Aligning {len(images)} cards...", 4)
+        outcomes = smeargle.process_batch(images, args, paths)
+        for item, path, (roi, _, status) in zip(loaded, paths, outcomes):
+            # The workers closed their own artifacts; close the original this process wrote
+            smeargle.finish_debug(path, status)
+            roi = finish_card(item, args, roi, status)
+            if roi is not None:
+                processed.append(item)
+                rois.append(roi)
+        loaded.clear(); images.clear(); paths.clear()
+        pending[0] = 0
+
+    for item in items:
+        image, path = load_card(item, args, USE_LOCAL_STORAGE)
+        if image is None:
+            continue
+        if reuse_verdict(item, image, duplicates):
+            # A reused verdict is not an alignment failure, so its original is not kept
+            smeargle.finish_debug(path, "ok")
+            continue
+        if images and pending[0] + image.nbytes > smeargle.SHARED_BATCH_BYTES:
+            align()
+        loaded.append(item)
+        images.append(image)
+        paths.append(path)
+        pending[0] += image.nbytes
+    if images:
+        align()
+    return processed, rois
+
+def report_rejects() -> None:
+    """
+    Summarise the images smeargle rejected before alignment, by reason.
+    """
+    rejects = smeargle.reject_counts()
+    if rejects:
+        rotom.print_with_color(f"Rejected {sum(rejects.values())} images before alignment: "
+                               f"{', '.join(f'{reason} {count}' for reason, count in sorted(rejects.items()))}", 4)
+
+def classify(AI: porygon.models.Sequential, items: list[dict], rois: list, USE_RGB: bool, duplicates: smeargle.DuplicateIndex | None = None) -> None:
+    """
+    Run the model over a batch of ROIs and record each verdict on its card, and in `duplicates` if given.
+    """
+    if not rois:
+        return
+    truth_values, confs = porygon.predict_and_visualize(AI, porygon.np.array(rois), USE_RGB=USE_RGB)
+
+    for truth_value, conf, card in zip(truth_values, confs, items):
+        if truth_value == -1:
+            card['truth'] = False
+            card['note'] = "uncertain_low_conf"
+        else:
+            card['truth'] = bool(truth_value == 0)
+            card['confidence'] = float(conf)
+
+    if duplicates is not None:
+        for card, roi in zip(items, rois):
+            if 'dhash' in card:
+                duplicates.add(int(card['dhash'], 16), {key: card[key] for key in ('truth', 'confidence', 'note') if key in card})
+
+def run_pipeline(download: Callable[[queue.Queue, threading.Event], None], align: Callable[[int, bytes], list], infer: Callable[[list], None], queue_size: int = STREAM_QUEUE_SIZE, cv_workers: int = STREAM_CV_WORKERS, batch_size: int = STREAM_BATCH_SIZE) -> None:
+    """
+    Run download, alignment and inference as a streaming pipeline.
+
+    Downloads feed a bounded queue drained by `cv_workers` alignment threads,
+    whose outputs feed a second bounded queue drained by batched inference on
+    the calling thread. Full queues block the stage upstream, so at most about
+    `queue_size` encoded images and `queue_size` ROIs are held at once,
+    whatever the number of listings.
+    An error `align` does not handle itself, or any error `infer` raises, sets
+    the stop event so no further images are downloaded or aligned, and is
+    raised on the calling thread once both queues have drained.
+
+    Args:
+        - download (Callable): Puts (index, encoded image) pairs on the queue it is given until the event it is given is set.
+        - align (Callable): Turns one (index, encoded image) pair into a list of ROI payloads.
+        - infer (Callable): Consumes a batch of ROI payloads.
+        - queue_size (int): Capacity of each inter-stage queue.
+        - cv_workers (int): Number of alignment threads.
+        - batch_size (int): Maximum number of ROI payloads per inference batch.
+    """
+    downloads: queue.Queue = queue.Queue(maxsize=queue_size)
+    rois: queue.Queue = queue.Queue(maxsize=queue_size)
+    done = object()
+    errors: list[BaseException] = []
+    stop = threading.Event()
+
+    def fetch() -> None:
+        try:
+            download(downloads, stop)
+        finally:
+            for _ in range(cv_workers):
+                downloads.put(done)
+
+    def work() -> None:
+        while (task := downloads.get()) is not done:
+            if stop.is_set():
+                # Keep draining so the download stage is never left blocked on a full queue
+                continue
+            try:
+                for payload in align(*task):
+                    rois.put(payload)
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+
+    def finish(workers: list[threading.Thread]) -> None:
+        for worker in workers:
+            worker.join()
+        rois.put(done)
+
+    workers = [threading.Thread(target=work, daemon=True) for _ in range(cv_workers)]
+    threads = [threading.Thread(target=fetch, daemon=True), *workers, threading.Thread(target=finish, args=(workers,), daemon=True)]
+    for thread in threads:
+        thread.start()
+
+    finished = False
+    try:
+        while not finished:
+            batch = [rois.get()]
+            while len(batch) < batch_size and batch[-1] is not done:
+                try:
+                    batch.append(rois.get(timeout=STREAM_BATCH_WAIT))
+                except queue.Empty:
+                    break
+            if batch[-1] is done:
+                batch.pop()
+                finished = True
+            if batch:
+                infer(batch)
+    finally:
+        if not finished:
+            # Inference failed: stop the other stages and drain them so no thread is left blocked
+            stop.set()
+            while rois.get() is not done:
+                pass
+    if errors:
+        raise errors[0]
+
+def stream_cards(cards: list[dict], args: dict, AI: porygon.models.Sequential, USE_LOCAL_STORAGE: bool, USE_RGB: bool, queue_size: int = STREAM_QUEUE_SIZE, cv_workers: int = STREAM_CV_WORKERS, batch_size: int = STREAM_BATCH_SIZE, duplicates: smeargle.DuplicateIndex | None = None) -> list[dict]:
+    """
+    Download, align and classify cards as a streaming pipeline, see run_pipeline().
+
+    Args:
+        - cards (list): Card dictionaries holding 'title', 'product_url' and 'image_url'.
+        - args (dict): Defect configuration parsed from config.json.
+        - AI (models.Sequential): Trained classifier.
+        - USE_LOCAL_STORAGE (bool): Store downloads under the defect's input_dir and load them from there.
+        - USE_RGB (bool): Whether the model takes RGB input.
+        - queue_size (int): Capacity of each inter-stage queue.
+        - cv_workers (int): Number of alignment threads.
+        - batch_size (int): Maximum number of ROIs per inference batch.
+        - duplicates (DuplicateIndex): Index of classified photos whose verdicts may be reused, or None.
+
+    Returns:
+    - list: Classified cards in their original order, including those that reused a near-duplicate's
+      verdict; cards that failed to download or align are dropped.
+    """
+    reused: list[int] = []
+    classified: list[int] = []
+
+    def download(downloads: queue.Queue, stop: threading.Event) -> None:
+        spinarak.stream_images(cards, downloads, args.get('input_dir', ''), USE_LOCAL_STORAGE, resolution=args.get('resolution'), stop=stop)
 
+    def align(index: int, content: bytes) -> list:
+        card = cards[index]
+        if not content:
+            rotom.print_with_color(f"No image downloaded for: {card['title']}", 3)
+            return []
+        card['image'] = bytearray(content)
+        try:
+            roi, status = process_card(card, args, USE_LOCAL_STORAGE, duplicates)
+        except ALIGN_ERRORS as e:
+            rotom.print_with_color(f"Failed to process '{card['title']}': {e}", 3)
+            card.pop('image', None)
+            return []
+        if status == "duplicate":
+            reused.append(index)
+        return [(index, roi)] if roi is not None else []
+
+    def infer(batch: list) -> None:
+        classify(AI, [cards[index] for index, _ in batch], [roi for _, roi in batch], USE_RGB, duplicates)
+        classified.extend(index for index, _ in batch)
+
+    run_pipeline(download, align, infer, queue_size, cv_workers, batch_size)
+    return [cards[index] for index in sorted(classified + reused)]
+
+def load_config(defect: str) -> dict:
+    """
+    Parse the configuration of one defect from config.json.
+    """
+    return rotom.parse_JSON_as_arguments('config.json', defect, CONFIG_KEYS)
+
+def establish_model(defect: str, args: dict, USE_RGB: bool, download_dataset: bool, verbose: bool = False) -> porygon.models.Sequential:
+    """
+    Load a defect's classifier from the model registry, training and registering it only when needed.
+
+    A registered model is reused while its training config matches; if the dataset is on disk its
+    version must match too, so a changed dataset triggers a retrain.
+
+    Args:
+        - defect (str): Defect the classifier detects.
+        - args (dict): Defect configuration parsed from config.json; 'training_dir' is updated to the dataset cache directory.
+        - USE_RGB (bool): Whether the model takes RGB input.
+        - download_dataset (bool): Refresh the cached dataset from Kaggle if it is missing or stale.
+        - verbose (bool): Display a sample of the dataset.
+
+    Returns:
+    - models.Sequential: Trained classifier.
+    """
+    config = porygon.training_config(args, USE_RGB)
+    if download_dataset or not rotom.directory_check(args.get("training_dir", "")):
+        args.update({'training_dir': porygon.get_dataset(args.get('author', ''), args['dataset'], download_dataset)})
+    if not rotom.directory_check(args.get("training_dir", "")):
+        AI = porygon.load_registered_model(defect, config)
+        if AI is not None:
+            return AI
+        rotom.print_with_color(f"No training data or registered model is available for '{defect}'", 1)
+    version = porygon.dataset_version(args.get("training_dir", ""))
+    AI = porygon.load_registered_model(defect, config, version)
+    if AI is not None:
+        return AI
+
+    rotom.print_with_color(f"Training the classifier for '{defect}'...", 4)
+    train_ds, test_ds, (testing_images, testing_labels, testing_files) = porygon.load_streaming_datasets(args.get("training_dir", ""), args.get('input_shape', [128, 128]), USE_RGB)
+    if verbose: porygon.display_sample(list(testing_images), list(testing_labels), testing_files)
+
+    AI = porygon.build_model(args.get('num_classes', ''), USE_RGB)
+    porygon.train_model_streaming(AI, train_ds)
+    porygon.evaluate_model(AI, test_ds)
+    porygon.predict_and_visualize(AI, testing_images, testing_labels, USE_RGB, testing=True)
+    porygon.register_model(AI, defect, config, version)
+    return AI
+
+def get_duplicates(defect: str, args: dict, AI: porygon.models.Sequential) -> smeargle.DuplicateIndex | None:
+    """
+    Return the near-duplicate photo index of a defect, serving the verdicts of its classifier `AI`,
+    or None if its configuration has no 'dedup' settings.
+    """
+    if not args.get('dedup'):
+        return None
+    return smeargle.get_duplicate_index(os.path.join(smeargle.DEDUP_DIR, defect), **args['dedup'], model=porygon.model_key(AI))
+
+def crawl(token: str, args: dict, threshold: float, incremental: bool = False, full_resync: bool = False, crawl_scope: str = '') -> list[dict]:
+    """
+    Search eBay with a defect's queries and collect the listings that have an image.
+
+    Returns:
+    - list: Card dictionaries holding 'title', 'product_url' and 'image_url'.
+    """
+    cards = []
     queries = args.get('queries', [])
 
-    for query in queries:
-        rotom.print_with_color(f"Searching for Pokémon card listings '{query}'...", 4)
-        results = spinarak.search_pokemon_cards(token, price=threshold, query=query)
+    rotom.print_with_color(f"Searching for Pokémon card listings {', '.join(repr(query) for query in queries)}...", 4)
+    search_results, dropped = spinarak.deduplicate_listings(spinarak.search_queries(
+        token, list(queries), price=threshold, incremental=incremental, full_resync=full_resync, state_scope=crawl_scope))
 
-        rotom.print_with_color("Downloading listing images...", 4)
+    for query, results in search_results.items():
+        rotom.print_with_color(f"Found {len(results.get('itemSummaries', []))} new listings for '{query}' ({dropped.get(query, 0)} duplicates dropped)", 4)
 
         for item in results.get('itemSummaries', []):
             card = {
@@ -68,68 +401,329 @@ def main(defect: str, threshold: float, USE_LOCAL_STORAGE: bool, USE_RGB: bool,
                 'product_url': item.get('itemWebUrl', ''),
                 'image_url': item.get('image', {}).get('imageUrl', '')
             }
-        
+
             if card['image_url']:
-                card['image'] = bytearray(spinarak.download_image(card['image_url'], card['title'], args.get('input_dir', ''), USE_LOCAL_STORAGE))
-                items.append(card)
+                cards.append(card)
                 continue
             rotom.print_with_color(f"No image found for: {card['title']}", 3)
-            
+    return cards
 
-    rotom.print_with_color("Listed Images have been downloaded! 🥳", 2)
-    rotom.pause(10)
+def align_listing(listing: dict, configs: dict[str, dict], duplicates: dict[str, smeargle.DuplicateIndex | None], USE_LOCAL_STORAGE: bool) -> dict:
+    """
+    Decode one listing photo once and extract the ROI of every defect it is wanted for from a single card location.
 
-    rois = []
-    for item in items:
-        rotom.print_with_color(f"Processing {item['title']}...", 4)
-        image = None
-        path = ''
-        if USE_LOCAL_STORAGE:
-            image, path = smeargle.load_file_from_directory(item['title'], args.get('input_dir', ''), args.get('debugging_dir', ''))
-        else:
-            image, path = smeargle.load_file_from_bytearray(item.get('image', bytearray()), item.get('title', 'no_title'))
-        if 'image' in item:
-            item.pop('image')
-        if 'image' in item.keys():
-            item.pop('image')
-        for key in item:
-            if key == 'image':
-                item.pop('image')
-        image_edges = smeargle.detect_edges(image, path)
-
-        approx = smeargle.detect_contours(image, image_edges)
-
-        if len(approx) != 4:
-            rotom.print_with_color(f"Skipping '{item['title']}' — could not detect card corners.", 3)
-            items.remove(item)
+    Args:
+        - listing (dict): Listing holding the shared 'card', the 'defects' it is wanted for and, unless stored locally, 'image'.
+        - configs (dict): Defect configurations keyed by defect name. The first one drives decoding, as it drove
+          the download; the first of the listing's defects drives card detection.
+        - duplicates (dict): Near-duplicate photo index of each defect, or None.
+        - USE_LOCAL_STORAGE (bool): Load the image from the image store instead of 'image'.
+
+    Returns:
+    - dict: ROI resized to each defect's input shape, for the defects that produced one and did not reuse a verdict.
+    """
+    card = listing['card']
+    rotom.print_with_color(f"Processing {card['title']}...", 4)
+    item = dict(card, image=listing.pop('image', bytearray()))
+    image, path = load_card(item, next(iter(configs.values())), USE_LOCAL_STORAGE)
+    if image is None:
+        return {}
+
+    value = smeargle.dhash(image) if any(duplicates.get(defect) is not None for defect in listing['defects']) else None
+    wanted = {}
+    for defect in listing['defects']:
+        if not reuse_verdict(listing['verdicts'][defect], image, duplicates.get(defect), value):
+            wanted[defect] = configs[defect]
+    if not wanted:
+        smeargle.finish_debug(path, "ok")
+    rois = {}
+    for defect, (roi, _, status) in smeargle.process_image_multi(image, wanted, path).items():
+        roi = finish_card(card, configs[defect], roi, status)
+        if roi is not None:
+            rois[defect] = roi
+    return rois
+
+def run_tasks(tasks: list[dict], models: dict, USE_LOCAL_STORAGE: bool = False, USE_RGB: bool = True, download_dataset: bool = True, incremental: bool = True, debug_mode: str = 'off', debug_every: int = smeargle.DEBUG_EVERY, cv_workers: int = STREAM_CV_WORKERS) -> list[list[dict]]:
+    """
+    Run every pending task in one crawl-and-align pass.
+
+    Each task is crawled with its own queries, price threshold and crawl
+    scope, but a listing found by several tasks is downloaded, decoded and
+    located once, and the ROIs of all the defects it is wanted for come from
+    that single alignment. Each defect's ROIs are then classified with its
+    own model. Listings stream through run_pipeline().
+
+    Args:
+        - tasks (list): Tasks holding 'defect', 'threshold' and 'id'.
+        - models (dict): Classifier per defect; refreshed from the model registry, training only when the dataset or config changed.
+        - USE_LOCAL_STORAGE (bool): Store downloads in the image store and load them from there.
+        - USE_RGB (bool): Whether the models take RGB input.
+        - download_dataset (bool): Download missing training datasets from Kaggle.
+        - incremental (bool): Crawl only listings newer than each task's high-water marks.
+        - debug_mode (str): Debug writer mode, see smeargle.DebugWriter.
+        - debug_every (int): Card interval of the 'sampled' debug mode.
+        - cv_workers (int): Number of alignment threads.
+
+    Returns:
+    - list: For each task, in order, its classified cards.
+    """
+    smeargle.configure_debug(debug_mode, debug_every)
+    smeargle.reset_reject_counts()
+    defects = list(dict.fromkeys(task.get('defect', '') for task in tasks))
+    configs = {defect: load_config(defect) for defect in defects}
+    for defect in defects:
+        models[defect] = establish_model(defect, configs[defect], USE_RGB, download_dataset)
+    duplicates = {defect: get_duplicates(defect, configs[defect], models[defect]) for defect in defects}
+
+    CLIENT_ID, CLIENT_SECRET = rotom.enviromentals('EBAY_CLIENT_ID', 'EBAY_CLIENT_SECRET')
+    rotom.print_with_color("Authenticating with eBay...", 4)
+    token = spinarak.get_ebay_token(CLIENT_ID, CLIENT_SECRET)
+
+    listings: dict[str, dict] = {}
+    for number, task in enumerate(tasks):
+        defect = task.get('defect', '')
+        for card in crawl(token, configs[defect], task.get('threshold', 0), incremental, crawl_scope=str(task.get('id', ''))):
+            listing = listings.setdefault(card['image_url'], {'card': card, 'defects': [], 'tasks': [], 'verdicts': {}})
+            if defect not in listing['defects']:
+                listing['defects'].append(defect)
+                listing['verdicts'][defect] = dict(listing['card'])
+            listing['tasks'].append(number)
+
+    unique = list(listings.values())
+    primary = configs[defects[0]] if defects else {}
+
+    def download(downloads: queue.Queue, stop: threading.Event) -> None:
+        spinarak.stream_images([listing['card'] for listing in unique], downloads, primary.get('input_dir', ''), USE_LOCAL_STORAGE, resolution=primary.get('resolution'), stop=stop)
+
+    def align(index: int, content: bytes) -> list:
+        listing = unique[index]
+        if not content:
+            rotom.print_with_color(f"No image downloaded for: {listing['card']['title']}", 3)
+            return []
+        listing['image'] = bytearray(content)
+        try:
+            rois = align_listing(listing, configs, duplicates, USE_LOCAL_STORAGE)
+        except ALIGN_ERRORS as e:
+            rotom.print_with_color(f"Failed to process '{listing['card']['title']}': {e}", 3)
+            listing.pop('image', None)
+            return []
+        return [(index, defect, roi) for defect, roi in rois.items()]
+
+    def infer(batch: list) -> None:
+        for defect in defects:
+            chosen = [(unique[index]['verdicts'][defect], roi) for index, batch_defect, roi in batch if batch_defect == defect]
+            if chosen:
+                classify(models[defect], [card for card, _ in chosen], [roi for _, roi in chosen], USE_RGB, duplicates[defect])
+
+    rotom.print_with_color(f"Streaming {len(unique)} listing images for {len(tasks)} tasks through alignment and classification...", 4)
+    run_pipeline(download, align, infer, cv_workers=cv_workers)
+    for index in duplicates.values():
+        if index is not None:
+            index.flush()
+    report_rejects()
+    smeargle.flush_debug()
+
+    results: list[list[dict]] = [[] for _ in tasks]
+    for listing in unique:
+        for number in listing['tasks']:
+            card = listing['verdicts'][tasks[number].get('defect', '')]
+            if 'truth' in card:
+                results[number].append(card)
+    return results
+
+def load_manifest(manifest_path: str) -> dict[str, dict]:
+    """
+    Read the entries of a folder-run manifest, keyed by path.
+
+    A line cut short by an interrupted run is ignored, so that file is processed again.
+    """
+    entries = {}
+    if not os.path.isfile(manifest_path):
+        return entries
+    with open(manifest_path, 'r') as fp:
+        for line in fp:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entries[entry['path']] = entry
+    return entries
+
+def walk_images(folder: str, skip: dict | set = ()) -> list[str]:
+    """
+    List the card images under `folder`, as sorted paths relative to it, leaving out those in `skip`.
+    """
+    found = []
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for file in sorted(files):
+            if os.path.splitext(file)[1].lower() in IMAGE_EXTENSIONS:
+                relative = os.path.relpath(os.path.join(root, file), folder)
+                if relative not in skip:
+                    found.append(relative)
+    return found
+
+def process_folder(folder: str, args: dict, AI: porygon.models.Sequential, USE_RGB: bool, manifest_path: str = '', cv_workers: int = STREAM_CV_WORKERS, batch_size: int = STREAM_BATCH_SIZE) -> str:
+    """
+    Align and classify every card image under a folder, recording each outcome in a JSONL manifest as it goes.
+
+    Each manifest line holds the image's path relative to `folder`, the
+    SHA-256 of its bytes, the alignment status and template score, and the
+    verdict and confidence (null when no ROI was extracted). Files already in
+    the manifest are skipped, so an interrupted run resumes where it stopped.
+
+    Args:
+        - folder (str): Directory tree of scanned card images.
+        - args (dict): Defect configuration parsed from config.json.
+        - AI (models.Sequential): Trained classifier.
+        - USE_RGB (bool): Whether the model takes RGB input.
+        - manifest_path (str): Manifest to append to, by default 'manifest.jsonl' in `folder`.
+        - cv_workers (int): Number of alignment threads.
+        - batch_size (int): Maximum number of ROIs per inference batch.
+
+    Returns:
+    - str: Path of the manifest.
+    """
+    manifest_path = manifest_path or os.path.join(folder, MANIFEST_NAME)
+    done = load_manifest(manifest_path)
+    if os.path.isfile(manifest_path) and os.path.getsize(manifest_path):
+        with open(manifest_path, 'rb+') as fp:
+            fp.seek(-1, os.SEEK_END)
+            if fp.read(1) != b'\n':
+                # End the line an interrupted run cut short, so the next entry starts cleanly
+                fp.write(b'\n')
+    paths = walk_images(folder, done)
+    rotom.print_with_color(f"{len(paths)} card images to process under '{folder}' ({len(done)} already in the manifest)", 4)
+    lock = threading.Lock()
+    written = [0]
+
+    def record(entry: dict) -> None:
+        with lock:
+            with open(manifest_path, 'a') as fp:
+                fp.write(json.dumps(entry) + '\n')
+            written[0] += 1
+
+    def read(files: queue.Queue, stop: threading.Event) -> None:
+        for index, path in enumerate(paths):
+            if stop.is_set():
+                return
+            try:
+                with open(os.path.join(folder, path), 'rb') as fp:
+                    files.put((index, fp.read()))
+            except OSError as e:
+                rotom.print_with_color(f"Could not read '{path}': {e}", 3)
+                record({'path': path, 'sha256': None, 'status': 'unreadable', 'score': None, 'verdict': None, 'confidence': None})
+
+    def align(index: int, content: bytes) -> list:
+        path = paths[index]
+        entry = {'path': path, 'sha256': hashlib.sha256(content).hexdigest(), 'status': 'unreadable', 'score': None, 'verdict': None, 'confidence': None}
+        try:
+            debug_path = os.path.join(args.get('debugging_dir', ''), os.path.splitext(path)[0])
+            if args.get('gate') is not None:
+                image, reason = smeargle.gate_image(content, args['gate'])
+                entry['status'] = 'unreadable' if image is None and reason == 'undecodable' else reason
+                debug_path = smeargle.select_debug(debug_path) if image is not None else ''
+                smeargle.write_debug(debug_path, "1_original.jpg", image)
+            else:
+                image, debug_path = smeargle.load_file_from_bytearray(bytearray(content), debug_path)
+            if image is not None:
+                roi, score, entry['status'] = smeargle.process_image(image, args, debug_path)
+                entry['score'] = float(score)
+                if roi is not None:
+                    return [(entry, porygon.cv2.resize(roi, args.get('input_shape', [128, 128])))]
+        except ALIGN_ERRORS as e:
+            rotom.print_with_color(f"Failed to process '{path}': {e}", 3)
+            entry['status'] = 'error'
+        record(entry)
+        return []
+
+    def infer(batch: list) -> None:
+        entries = [entry for entry, _ in batch]
+        classify(AI, entries, [roi for _, roi in batch], USE_RGB)
+        for entry in entries:
+            entry['verdict'] = entry.pop('truth', None)
+            entry.setdefault('confidence', None)
+            record(entry)
+        rotom.print_with_color(f"{written[0]}/{len(paths)} card images recorded", 4)
+
+    run_pipeline(read, align, infer, cv_workers=cv_workers, batch_size=batch_size)
+    report_rejects()
+    smeargle.flush_debug()
+    rotom.print_with_color(f"Manifest written to {manifest_path}", 2)
+    return manifest_path
+
+def main(defect: str, threshold: float, USE_LOCAL_STORAGE: bool, USE_RGB: bool, download_dataset: bool, verbose: bool = False, AI: porygon.models.Sequential | None = None, incremental: bool = False, full_resync: bool = False, crawl_scope: str = '', streaming: bool = False, debug_mode: str = 'all', debug_every: int = smeargle.DEBUG_EVERY):
+    args = load_config(defect)
+
+    rotom.clear_terminal()
+    smeargle.configure_debug(debug_mode, debug_every)
+    smeargle.reset_reject_counts()
+    if not streaming:
+        # Bring the alignment workers up while the model loads or trains
+        smeargle.start_pool()
+
+    if not AI:
+        AI = establish_model(defect, args, USE_RGB, download_dataset, verbose)
+    duplicates = get_duplicates(defect, args, AI)
+
+    CLIENT_ID, CLIENT_SECRET = rotom.enviromentals('EBAY_CLIENT_ID', 'EBAY_CLIENT_SECRET')
+
+    rotom.print_with_color("Authenticating with eBay...", 4)
+    token = spinarak.get_ebay_token(CLIENT_ID, CLIENT_SECRET)
+
+    items = []
+    cards = crawl(token, args, threshold, incremental, full_resync, crawl_scope)
+
+    if streaming:
+        rotom.print_with_color("Streaming listing images through alignment and classification...", 4)
+        items = stream_cards(cards, args, AI, USE_LOCAL_STORAGE, USE_RGB, duplicates=duplicates)
+        if duplicates is not None:
+            duplicates.flush()
+        report_rejects()
+        smeargle.flush_debug()
+        return items
+
+    rotom.print_with_color("Downloading listing images...", 4)
+    contents = spinarak.download_images(cards, args.get('input_dir', ''), USE_LOCAL_STORAGE, resolution=args.get('resolution'))
+    for card, content in zip(cards, contents):
+        if not content:
+            rotom.print_with_color(f"No image downloaded for: {card['title']}", 3)
             continue
+        card['image'] = bytearray(content)
+        items.append(card)
 
-        aligned = smeargle.draw_contours(image, approx, path, args.get('dimensions', [480, 680]))
-        roi, _, status = smeargle.roi_extraction(aligned, path, args.get('roi', [40, 45, 60, 60]))
-        if status != "ok":
-            rotom.print_with_color(f"The ROI for '{item['title']}' may be weird. Reason: {status}", 3)
-        rois.append(porygon.cv2.resize(roi, args.get('input_shape', [128, 128])))
-        rotom.print_with_color(f"Finished Processing {item['title']}", 2)
+    rotom.print_with_color("Listed Images have been downloaded! 🥳", 2)
+    rotom.pause(10)
 
-    truth_values, confs = porygon.predict_and_visualize(AI, porygon.np.array(rois), USE_RGB=USE_RGB)
+    processed, rois = process_cards(items, args, USE_LOCAL_STORAGE, duplicates)
+    report_rejects()
 
-    for truth_value, conf, card in zip(truth_values, confs, items):
-        if truth_value == -1:
-            card['truth'] = False
-            card['note'] = "uncertain_low_conf"
-        else:
-            card['truth'] = bool(truth_value == 0)
-            card['confidence'] = float(conf)
+    classify(AI, processed, rois, USE_RGB, duplicates)
+    if duplicates is not None:
+        duplicates.flush()
+    items = [item for item in items if 'truth' in item]
+    smeargle.flush_debug()
 
     rotom.pause(5)
     return items
 
 if __name__ == "__main__":
     args = rotom.pass_arguments_to_main()
+    if args.folder is not None:
+        config = load_config(args.defect)
+        smeargle.configure_debug(args.debug, args.debug_every)
+        smeargle.reset_reject_counts()
+        process_folder(args.folder, config, establish_model(args.defect, config, args.use_rgb, args.kaggle_download, args.verbose), args.use_rgb, args.manifest)
+        exit()
     with open('here', 'w') as fp: fp.write(str(main(
         args.defect,
         args.price,
         args.use_local_storage,
         args.use_rgb,
         args.kaggle_download,
-        args.verbose)))
\ No newline at end of file
+        args.verbose,
+        incremental=args.incremental,
+        full_resync=args.full_resync,
+        streaming=args.stream,
+        debug_mode=args.debug,
+        debug_every=args.debug_every)))
\ No newline at end of file
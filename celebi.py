@@ -1,3 +1,4 @@
+import os
 import schedule
 import arceus
 import rotom
@@ -5,17 +6,22 @@ import json
 import datetime
 
 models = {}
+# Per-card debug images for scheduled runs, see smeargle.DebugWriter for the modes
+DEBUG_MODE = os.getenv('DEBUG_MODE') or 'off'
+DEBUG_EVERY = int(os.getenv('DEBUG_EVERY') or arceus.smeargle.DEBUG_EVERY)
 
-def run_script(tasks: list[dict], AI=None):
-    for task in tasks:
-        results = arceus.main(
-            task.get('defect', ''),
-            task.get('threshold', 0),
-            USE_LOCAL_STORAGE=False,
-            USE_RGB=True,
-            download_dataset=True,
-            AI=AI
-        )
+def run_script(tasks: list[dict]):
+    every_result = arceus.run_tasks(
+        tasks,
+        models,
+        USE_LOCAL_STORAGE=False,
+        USE_RGB=True,
+        download_dataset=True,
+        incremental=True,
+        debug_mode=DEBUG_MODE,
+        debug_every=DEBUG_EVERY
+    )
+    for task, results in zip(tasks, every_result):
         #with open('logs/setup.log', 'a') as fp: fp.write(f'1 {results[0]}\n')
         for result in results:
             if 'image' in result:
@@ -68,8 +74,9 @@ def drop_redundancy(tasks: list[dict[str, str | int]]):
     return tasks
 
 def establish_model():
-    global AI
-    #AI = porygon.main()
+    for task in get_tasks():
+        defect = task.get('defect', '')
+        models[defect] = arceus.establish_model(defect, arceus.load_config(defect), True, True)
 
 def main():
     tasks = get_tasks()
@@ -77,11 +84,11 @@ def main():
 # ----------------------------
 # ⏰ Scheduler
 # ----------------------------
-#schedule.every(1).days.do(establish_model)
+schedule.every(1).days.do(establish_model)
 schedule.every(3).minutes.do(main)
 
 if __name__ == "__main__":
-    #establish_model()  # Ensure model is available before first run
+    establish_model()  # Ensure model is available before first run
     main()
     while True:
         schedule.run_pending()
\ No newline at end of file
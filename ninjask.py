@@ -0,0 +1,619 @@
+"""
+# Ninjask
+Benchmark module for PokéPrint Inspector.
+
+This module measures the cost and accuracy of pipeline stages:
+- Comparing eBay image size variants by bytes transferred and alignment success (process_image status and ROI match score)
+- Timing single-pass NCC ROI refinement against the per-offset scan it replaced
+- Comparing coarse-to-fine corner detection with full-resolution detection on synthetic photos
+- Timing ROI-only perspective warps against full-card warps and checking the ROIs are identical
+- Timing cached-feature ORB alignment against per-call brute-force matching
+- Timing every smeargle stage (p50/p95, cards/s) with corner and ROI error on synthetic photos
+  with random perspective, rotation, blur, backgrounds and JPEG quality
+
+Each benchmark prints a human-readable summary and writes machine-readable
+JSON results, so runs can be compared over time.
+
+Dependencies:
+- OpenCV (cv2)
+- NumPy
+- requests
+- spinarak.py, smeargle.py, rotom.py
+
+Usage:
+    python ninjask.py resolution --defect wartortle_evolution_error --price 20
+    python ninjask.py ncc --defect wartortle_evolution_error --cards 200
+    python ninjask.py corners --defect wartortle_evolution_error --max_side 480 640 800
+    python ninjask.py warp --defect wartortle_evolution_error --cards 100
+    python ninjask.py orb --defect wartortle_evolution_error --cards 50
+    python ninjask.py --output stages.json stages --defect wartortle_evolution_error --cards 200
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import cv2
+import numpy as np
+import rotom
+import smeargle
+import spinarak
+
+def write_results(results: dict, output: str) -> None:
+    """
+    Write benchmark results as JSON to `output`, or to stdout if it is empty.
+    """
+    if output:
+        with open(output, 'w') as fp:
+            json.dump(results, fp, indent=2)
+        rotom.print_with_color(f"Benchmark results written to {output}", 2)
+    else:
+        print(json.dumps(results, indent=2))
+
+def card_status(content: bytes, config: dict) -> tuple[str, float]:
+    """
+    Run the full smeargle alignment on an encoded image and return its status and ROI template match score.
+
+    Counting four corners is not enough: the minAreaRect fallback yields four corners for
+    almost any image, so only an 'ok' status shows that the ROI was really found.
+    """
+    img = cv2.imdecode(np.frombuffer(content, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        return 'undecodable', 0.0
+    _, score, status = smeargle.process_image(img, config)
+    return status, float(score)
+
+def benchmark_resolution(image_urls: list[str], sizes: list[int], config: dict) -> dict:
+    """
+    Download every listing image at each eBay size variant and compare bytes transferred and alignment success.
+
+    Args:
+        - image_urls (list): Listing image URLs as returned by the eBay search.
+        - sizes (list): Longest-side sizes to compare, e.g. [500, 800, 1600].
+        - config (dict): Defect configuration the images are aligned with.
+
+    Returns:
+    - dict: Per-size totals keyed by the size as a string.
+    """
+    session = spinarak.get_session()
+    results = {}
+    for size in sizes:
+        downloaded, total_bytes, failed = 0, 0, 0
+        statuses, scores = {}, []
+        start = time.perf_counter()
+        for url in image_urls:
+            size_url = spinarak.image_size_chain(url, {'min_long_side': size, 'sizes': [size]})[0]
+            try:
+                response = session.get(size_url, timeout=spinarak.DOWNLOAD_TIMEOUT)
+            except spinarak.requests.RequestException:
+                failed += 1
+                continue
+            if response.status_code != 200:
+                failed += 1
+                continue
+            downloaded += 1
+            total_bytes += len(response.content)
+            status, score = card_status(response.content, config)
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 'ok':
+                scores.append(score)
+        elapsed = time.perf_counter() - start
+        results[str(size)] = {
+            'images': downloaded,
+            'failed': failed,
+            'bytes': total_bytes,
+            'mean_bytes': total_bytes / downloaded if downloaded else 0,
+            'success_rate': statuses.get('ok', 0) / downloaded if downloaded else 0,
+            'statuses': statuses,
+            'mean_score': float(np.mean(scores)) if scores else None,
+            'seconds': elapsed
+        }
+        rotom.print_with_color(
+            f"s-l{size}: {downloaded} images, {total_bytes / 1e6:.2f} MB, "
+            f"{results[str(size)]['success_rate']:.1%} aligned ok, {elapsed:.1f}s", 4)
+    return results
+
+def legacy_refine_roi_by_ncc(aligned: np.ndarray, roi_box: tuple, roi_template_path: str, search: int = 8) -> tuple[tuple, float]:
+    """
+    Reference per-offset NCC scan, as smeargle did it before single-pass refinement.
+    """
+    x, y, w, h = roi_box
+    roi_template = cv2.imread(roi_template_path, cv2.IMREAD_COLOR)
+    if roi_template is None:
+        roi_template = np.zeros((h, w, 3), dtype=np.uint8)
+    if roi_template.shape[0] > h or roi_template.shape[1] > w:
+        roi_template = cv2.resize(roi_template, (w, h), interpolation=cv2.INTER_AREA)
+    best, best_off = -1.0, (0, 0)
+    for dy in range(-search, search+1):
+        for dx in range(-search, search+1):
+            xs, ys = x+dx, y+dy
+            patch = aligned[ys:ys+h, xs:xs+w]
+            if xs < 0 or ys < 0 or patch.shape[:2] != (h, w): continue
+            res = cv2.matchTemplate(cv2.cvtColor(patch, cv2.COLOR_BGR2GRAY),
+                                    cv2.cvtColor(roi_template, cv2.COLOR_BGR2GRAY),
+                                    cv2.TM_CCOEFF_NORMED)
+            score = float(res.max())
+            if score > best:
+                best, best_off = score, (dx, dy)
+    dx, dy = best_off
+    return (x+dx, y+dy, w, h), best
+
+def synthetic_aligned_cards(count: int, dimensions: tuple, roi_box: tuple, roi_template_path: str, search: int = 8, seed: int = 0) -> list[np.ndarray]:
+    """
+    Build aligned-card stand-ins: textured noise with the ROI template pasted near the ROI box.
+    """
+    rng = np.random.default_rng(seed)
+    width, height = dimensions
+    x, y, w, h = roi_box
+    template = cv2.imread(roi_template_path, cv2.IMREAD_COLOR)
+    template = cv2.resize(template if template is not None else np.zeros((h, w, 3), np.uint8), (w, h))
+    cards = []
+    for _ in range(count):
+        card = cv2.GaussianBlur(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), (7, 7), 0)
+        ox = int(np.clip(x + rng.integers(-search, search + 1), 0, width - w))
+        oy = int(np.clip(y + rng.integers(-search, search + 1), 0, height - h))
+        card[oy:oy+h, ox:ox+w] = np.clip(template + rng.normal(0, 6, template.shape), 0, 255).astype(np.uint8)
+        cards.append(card)
+    return cards
+
+def benchmark_ncc(cards: list[np.ndarray], roi_box: tuple, roi_template_path: str, search: int = 8) -> dict:
+    """
+    Time legacy and single-pass NCC refinement on the same cards and check that they agree.
+
+    Returns:
+    - dict: Per-card latency of both implementations, the speedup, box agreement and the largest score difference.
+    """
+    legacy_times, fast_times = [], []
+    agree, max_diff = 0, 0.0
+    smeargle.refine_roi_by_ncc(cards[0], roi_box, roi_template_path, search)  # warm the template cache
+    for card in cards:
+        start = time.perf_counter()
+        legacy_box, legacy_score = legacy_refine_roi_by_ncc(card, roi_box, roi_template_path, search)
+        legacy_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        box, score = smeargle.refine_roi_by_ncc(card, roi_box, roi_template_path, search)
+        fast_times.append(time.perf_counter() - start)
+
+        agree += box == legacy_box
+        max_diff = max(max_diff, abs(score - legacy_score))
+
+    results = {
+        'cards': len(cards),
+        'legacy_ms_per_card': 1000 * float(np.mean(legacy_times)),
+        'single_pass_ms_per_card': 1000 * float(np.mean(fast_times)),
+        'speedup': float(np.mean(legacy_times) / max(np.mean(fast_times), 1e-12)),
+        'box_agreement': agree / len(cards),
+        'max_score_difference': max_diff
+    }
+    rotom.print_with_color(
+        f"NCC refinement: {results['legacy_ms_per_card']:.2f} ms -> {results['single_pass_ms_per_card']:.2f} ms per card "
+        f"({results['speedup']:.0f}x), boxes agree on {results['box_agreement']:.1%}", 4)
+    return results
+
+def render_card(dimensions: tuple, roi_box: tuple, roi_template_path: str, rng: np.random.Generator) -> np.ndarray:
+    """
+    Render an upright synthetic card: a yellow border around textured artwork, with the ROI template in its ROI box.
+    """
+    width, height = dimensions
+    x, y, w, h = roi_box
+    template = cv2.imread(roi_template_path, cv2.IMREAD_COLOR)
+    template = cv2.resize(template if template is not None else np.zeros((h, w, 3), np.uint8), (w, h))
+    border = max(4, width // 16)
+    card = np.full((height, width, 3), (0, 215, 255), dtype=np.uint8)
+    card[border:height-border, border:width-border] = cv2.GaussianBlur(
+        rng.integers(0, 256, (height - 2 * border, width - 2 * border, 3), dtype=np.uint8), (9, 9), 0)
+    card[y:y+h, x:x+w] = template
+    return card
+
+def synthetic_background(photo_size: tuple, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draw a random photo background: flat, a gradient, blurred noise like a table or cloth, or stripes like wood grain.
+    """
+    photo_w, photo_h = photo_size
+    kind = rng.integers(0, 4)
+    color = rng.integers(10, 120, 3)
+    if kind == 0:
+        return np.full((photo_h, photo_w, 3), color, dtype=np.uint8)
+    if kind == 1:
+        ramp = np.linspace(0.5, 1.5, photo_w)[None, :, None] if rng.random() < 0.5 else np.linspace(0.5, 1.5, photo_h)[:, None, None]
+        return np.ascontiguousarray(np.broadcast_to(np.clip(color * ramp, 0, 255), (photo_h, photo_w, 3)), dtype=np.uint8)
+    if kind == 2:
+        noise = rng.normal(0, 25, (photo_h // 8, photo_w // 8, 3))
+        noise = cv2.resize(noise, (photo_w, photo_h), interpolation=cv2.INTER_LINEAR)
+        return np.clip(color + noise, 0, 255).astype(np.uint8)
+    period = rng.uniform(8, 40)
+    stripes = 20 * np.sin(np.arange(photo_h)[:, None, None] * 2 * np.pi / period + rng.normal(0, 0.3, (1, photo_w, 1)))
+    return np.clip(color + stripes, 0, 255).astype(np.uint8)
+
+def synthetic_card_photos(count: int, dimensions: tuple, roi_box: tuple, roi_template_path: str, photo_size: tuple = (1600, 1200), seed: int = 0, card: np.ndarray | None = None, max_rotation: float = 0.0, max_blur: float = 0.0, jpeg_quality: tuple | None = None, varied_backgrounds: bool = False) -> list[tuple[np.ndarray, np.ndarray]]:
+    """
+    Warp synthetic cards into larger photos with a random perspective.
+
+    Each photo gets a freshly rendered card, unless `card` is given, in which case every photo shows that card.
+
+    Args:
+        - max_rotation (float): Largest in-plane rotation of the card, in degrees either way.
+        - max_blur (float): Largest Gaussian blur sigma applied to the photo.
+        - jpeg_quality (tuple): (lowest, highest) JPEG quality to round-trip the photo through, or None for no compression.
+        - varied_backgrounds (bool): Draw backgrounds with synthetic_background() instead of flat grey.
+
+    Returns:
+    - list: (photo, corners) pairs, where corners are the true card corners in photo coordinates.
+    """
+    rng = np.random.default_rng(seed)
+    width, height = dimensions
+    photo_w, photo_h = photo_size
+    src = np.float32([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]])
+    photos = []
+    for _ in range(count):
+        shown = card if card is not None else render_card(dimensions, roi_box, roi_template_path, rng)
+        card_h = photo_h * rng.uniform(0.6, 0.85)
+        card_w = card_h * width / height
+        cx, cy = photo_w / 2 + rng.uniform(-0.1, 0.1) * photo_w, photo_h / 2 + rng.uniform(-0.05, 0.05) * photo_h
+        dst = np.float32([[cx - card_w / 2, cy - card_h / 2], [cx + card_w / 2, cy - card_h / 2],
+                          [cx + card_w / 2, cy + card_h / 2], [cx - card_w / 2, cy + card_h / 2]])
+        dst += rng.uniform(-0.04, 0.04, (4, 2)).astype(np.float32) * card_h
+        if max_rotation:
+            angle = np.deg2rad(rng.uniform(-max_rotation, max_rotation))
+            rotation = np.float32([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+            dst = (dst - (cx, cy)) @ rotation.T + (cx, cy)
+            dst = dst.astype(np.float32)
+        if varied_backgrounds:
+            background = synthetic_background(photo_size, rng)
+        else:
+            background = np.full((photo_h, photo_w, 3), rng.integers(20, 90), dtype=np.uint8)
+        M = cv2.getPerspectiveTransform(src, dst)
+        photo = cv2.warpPerspective(shown, M, (photo_w, photo_h), dst=background, borderMode=cv2.BORDER_TRANSPARENT)
+        if max_blur:
+            photo = cv2.GaussianBlur(photo, (0, 0), rng.uniform(0.1, max_blur))
+        if jpeg_quality:
+            quality = int(rng.integers(jpeg_quality[0], jpeg_quality[1] + 1))
+            photo = cv2.imdecode(cv2.imencode('.jpg', photo, [cv2.IMWRITE_JPEG_QUALITY, quality])[1], cv2.IMREAD_COLOR)
+        photos.append((photo, dst))
+    return photos
+
+def corner_error(detected: np.ndarray, truth: np.ndarray) -> float:
+    """
+    Mean distance in pixels between ordered detected corners and the true corners, or inf if detection failed.
+    """
+    if len(detected) != 4:
+        return float('inf')
+    return float(np.linalg.norm(smeargle.order_points(detected.reshape(4, 2).astype(np.float32)) - truth, axis=1).mean())
+
+def benchmark_corners(photos: list, max_sides: list[int], config: dict) -> dict:
+    """
+    Time smeargle.locate_card() at full resolution and coarse-to-fine at each `max_side`, with and without refinement.
+
+    Returns:
+    - dict: Per-variant latency, detection rate and corner error, keyed by variant name.
+    """
+    variants = [('full', 0, False)]
+    for max_side in max_sides:
+        variants += [(f'coarse_{max_side}', max_side, False), (f'coarse_{max_side}_refined', max_side, True)]
+    dimensions = config.get('dimensions', (480, 680))
+    results = {}
+    for name, max_side, refine in variants:
+        variant = dict(config, detection_max_side=max_side, refine_corners=refine)
+        times, errors = [], []
+        for photo, truth in photos:
+            start = time.perf_counter()
+            corners, M = smeargle.locate_card(photo, variant)
+            times.append(time.perf_counter() - start)
+            # Cards found by feature matching have no corners, only their homography
+            errors.append(corner_error(corners, truth) if corners is not None else homography_error(M, truth, dimensions))
+        found = [error for error in errors if np.isfinite(error)]
+        results[name] = {
+            'ms_per_card': 1000 * float(np.mean(times)),
+            'detection_rate': len(found) / len(photos),
+            'mean_corner_error_px': float(np.mean(found)) if found else None,
+            'p95_corner_error_px': float(np.percentile(found, 95)) if found else None
+        }
+        error_text = f"{results[name]['mean_corner_error_px']:.2f}px" if found else "n/a"
+        rotom.print_with_color(
+            f"{name}: {results[name]['ms_per_card']:.1f} ms per card, "
+            f"{results[name]['detection_rate']:.1%} detected, mean corner error {error_text}", 4)
+    return results
+
+def run_corners(args: argparse.Namespace) -> dict:
+    """
+    Benchmark corner detection on synthetic photos of a defect's card layout.
+    """
+    config = rotom.parse_JSON_as_arguments('config.json', args.defect, ['dimensions', 'roi', 'roi_template', 'card_template'])
+    photos = synthetic_card_photos(args.cards, config.get('dimensions', (480, 680)), config.get('roi', (40, 45, 60, 60)),
+                                   config.get('roi_template', ''), tuple(args.photo_size))
+    return benchmark_corners(photos, args.max_side, config)
+
+def benchmark_warp(photos: list, config: dict, search: int = 8) -> dict:
+    """
+    Time the full-card warp against the ROI-only warp on the same corners and compare the extracted ROIs.
+
+    Returns:
+    - dict: Per-card warp latency of both modes, the reduction in warp time and the share of pixel-identical ROIs.
+    """
+    dimensions = config.get('dimensions', (480, 680))
+    roi_box = config.get('roi', (40, 45, 60, 60))
+    roi_template = config.get('roi_template', smeargle.DEFAULT_ROI_TEMPLATE)
+    x, y, w, h = roi_box
+    window = smeargle.roi_window(roi_box, dimensions, search)
+    full_times, roi_times = [], []
+    identical = 0
+    for photo, corners in photos:
+        start = time.perf_counter()
+        aligned = cv2.warpPerspective(photo, smeargle.card_homography(corners, dimensions), tuple(dimensions), flags=cv2.INTER_LANCZOS4)
+        full_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        patch = smeargle.warp_window(photo, smeargle.card_homography(corners, dimensions), window)
+        roi_times.append(time.perf_counter() - start)
+
+        full_roi, full_score, _ = smeargle.roi_extraction(aligned, '', roi_box, roi_template, search)
+        roi, score, _ = smeargle.roi_extraction(patch, '', (x - window[0], y - window[1], w, h), roi_template, search)
+        identical += full_roi.shape == roi.shape and bool(np.array_equal(full_roi, roi)) and full_score == score
+
+    results = {
+        'cards': len(photos),
+        'full_warp_ms_per_card': 1000 * float(np.mean(full_times)),
+        'roi_warp_ms_per_card': 1000 * float(np.mean(roi_times)),
+        'warp_time_reduction': 1 - float(np.mean(roi_times) / max(np.mean(full_times), 1e-12)),
+        'identical_rois': identical / len(photos)
+    }
+    rotom.print_with_color(
+        f"Warp: {results['full_warp_ms_per_card']:.2f} ms -> {results['roi_warp_ms_per_card']:.2f} ms per card "
+        f"({results['warp_time_reduction']:.1%} less), identical ROIs on {results['identical_rois']:.1%}", 4)
+    return results
+
+def run_warp(args: argparse.Namespace) -> dict:
+    """
+    Benchmark ROI-only warping on synthetic photos, using the true card corners.
+    """
+    config = rotom.parse_JSON_as_arguments('config.json', args.defect, ['dimensions', 'roi', 'roi_template'])
+    photos = synthetic_card_photos(args.cards, config.get('dimensions', (480, 680)), config.get('roi', (40, 45, 60, 60)),
+                                   config.get('roi_template', ''), tuple(args.photo_size))
+    return benchmark_warp(photos, config, args.search)
+
+def legacy_orb_homography(img: np.ndarray, template: np.ndarray) -> np.ndarray | None:
+    """
+    Reference ORB alignment, as smeargle did it before template features were cached: recomputed template
+    features, brute-force matching and a full sort of the matches.
+    """
+    orb = cv2.ORB.create(1500)
+    kp1, des1 = orb.detectAndCompute(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), np.array([]))
+    kp2, des2 = orb.detectAndCompute(cv2.cvtColor(template, cv2.COLOR_BGR2GRAY),  np.array([]))
+    if des1 is None or des2 is None: return None
+    bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=False)
+    matches = sorted(bf.match(des1, des2), key=lambda m: m.distance)[:200]
+    if len(matches) < 10: return None
+    src = np.array([kp1[m.queryIdx].pt for m in matches], dtype=np.float32).reshape(-1,1,2)
+    dst = np.array([kp2[m.trainIdx].pt for m in matches], dtype=np.float32).reshape(-1,1,2)
+    H, mask = cv2.findHomography(src, dst, cv2.RANSAC, 5.0)
+    return H
+
+def homography_error(H: np.ndarray | None, truth: np.ndarray, dimensions: tuple) -> float:
+    """
+    Mean distance in pixels between the card corners implied by an image-to-card homography and the true corners.
+    """
+    if H is None:
+        return float('inf')
+    width, height = dimensions
+    card_corners = np.float32([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]]).reshape(-1, 1, 2)
+    try:
+        corners = cv2.perspectiveTransform(card_corners, np.linalg.inv(H))
+    except np.linalg.LinAlgError:
+        return float('inf')
+    return float(np.linalg.norm(corners.reshape(4, 2) - truth, axis=1).mean())
+
+def benchmark_orb(photos: list, card_template_path: str, dimensions: tuple, max_side: int = 0, tolerance: float = 5.0) -> dict:
+    """
+    Time ORB alignment with and without cached template features and count the cards each recovers.
+
+    A card counts as recovered when the implied corners are within `tolerance` pixels of the true ones on average.
+
+    Returns:
+    - dict: Per-card latency and recovery rate of both implementations.
+    """
+    template = cv2.resize(cv2.imread(card_template_path, cv2.IMREAD_COLOR), tuple(dimensions), interpolation=cv2.INTER_AREA)
+    smeargle.load_card_features(card_template_path, dimensions)
+    results = {}
+    for name, align in (('legacy', lambda photo: legacy_orb_homography(photo, template)),
+                        ('cached_lsh', lambda photo: smeargle.orb_homography(photo, card_template_path, dimensions, max_side))):
+        times, errors = [], []
+        for photo, truth in photos:
+            start = time.perf_counter()
+            H = align(photo)
+            times.append(time.perf_counter() - start)
+            errors.append(homography_error(H, truth, dimensions))
+        results[name] = {
+            'ms_per_card': 1000 * float(np.mean(times)),
+            'recovery_rate': float(np.mean([error < tolerance for error in errors]))
+        }
+        rotom.print_with_color(
+            f"ORB {name}: {results[name]['ms_per_card']:.1f} ms per card, {results[name]['recovery_rate']:.1%} recovered", 4)
+    results['speedup'] = results['legacy']['ms_per_card'] / max(results['cached_lsh']['ms_per_card'], 1e-12)
+    return results
+
+def run_orb(args: argparse.Namespace) -> dict:
+    """
+    Benchmark ORB alignment on synthetic photos of one rendered card, using that card as the template.
+    """
+    config = rotom.parse_JSON_as_arguments('config.json', args.defect, ['dimensions', 'roi', 'roi_template', 'detection_max_side'])
+    dimensions = config.get('dimensions', (480, 680))
+    roi_box = config.get('roi', (40, 45, 60, 60))
+    card = render_card(dimensions, roi_box, config.get('roi_template', ''), np.random.default_rng(1))
+    with tempfile.TemporaryDirectory() as tmp:
+        card_template_path = os.path.join(tmp, 'card_template.png')
+        cv2.imwrite(card_template_path, card)
+        photos = synthetic_card_photos(args.cards, dimensions, roi_box, '', tuple(args.photo_size), card=card)
+        return benchmark_orb(photos, card_template_path, dimensions, config.get('detection_max_side', 0))
+
+def percentiles(times: list[float]) -> dict:
+    """
+    Summarise stage latencies in milliseconds.
+    """
+    ms = 1000 * np.asarray(times)
+    return {'p50_ms': float(np.percentile(ms, 50)), 'p95_ms': float(np.percentile(ms, 95)), 'mean_ms': float(ms.mean())}
+
+def roi_error(box: tuple, corners: np.ndarray, truth: np.ndarray, config: dict) -> float:
+    """
+    Distance in aligned-card pixels between the refined ROI box and where the true ROI lands under the detected alignment.
+    """
+    dimensions = config.get('dimensions', (480, 680))
+    x, y, w, h = config.get('roi', (40, 45, 60, 60))
+    width, height = dimensions
+    src = np.float32([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]])
+    true_M = cv2.getPerspectiveTransform(src, truth.astype(np.float32))
+    centre = np.float32([[[x + w / 2, y + h / 2]]])
+    landed = cv2.perspectiveTransform(cv2.perspectiveTransform(centre, true_M), smeargle.card_homography(corners, dimensions))
+    bx, by, bw, bh = box
+    return float(np.linalg.norm(landed.reshape(2) - (bx + bw / 2, by + bh / 2)))
+
+def benchmark_stages(photos: list, config: dict, search: int = 8) -> dict:
+    """
+    Time each smeargle stage on synthetic photos and measure corner and ROI accuracy.
+
+    The stages run as the full-card debug path does: detect_edges, detect_contours,
+    draw_contours, refine_roi_by_ncc and roi_extraction. process_image is timed
+    separately, as the production path with ROI-only warping, and gives cards/s.
+
+    Returns:
+    - dict: p50/p95/mean latency per stage, end-to-end cards/s, detection rate and corner/ROI error.
+    """
+    dimensions = config.get('dimensions', (480, 680))
+    roi_box = config.get('roi', (40, 45, 60, 60))
+    roi_template = config.get('roi_template', smeargle.DEFAULT_ROI_TEMPLATE)
+    max_side, refine = config.get('detection_max_side', 0), config.get('refine_corners', False)
+    stages = {name: [] for name in ('detect_edges', 'detect_contours', 'draw_contours', 'refine_roi_by_ncc', 'roi_extraction', 'process_image')}
+    corner_errors, roi_errors, statuses = [], [], {}
+
+    def timed(name: str, function, *args):
+        start = time.perf_counter()
+        result = function(*args)
+        stages[name].append(time.perf_counter() - start)
+        return result
+
+    smeargle.configure_debug('off')
+    for photo, truth in photos:
+        edges = timed('detect_edges', smeargle.detect_edges, photo, '')
+        approx = timed('detect_contours', smeargle.detect_contours, photo, edges, max_side, refine)
+        _, _, status = timed('process_image', smeargle.process_image, photo, config, '', search)
+        statuses[status] = statuses.get(status, 0) + 1
+        if len(approx) != 4:
+            continue
+        corner_errors.append(corner_error(approx, truth))
+        aligned = timed('draw_contours', smeargle.draw_contours, photo, approx, '', dimensions)
+        box, _ = timed('refine_roi_by_ncc', smeargle.refine_roi_by_ncc, aligned, roi_box, roi_template, search)
+        timed('roi_extraction', smeargle.roi_extraction, aligned, '', roi_box, roi_template, search)
+        roi_errors.append(roi_error(box, approx, truth, config))
+
+    results = {
+        'cards': len(photos),
+        'stages': {name: percentiles(times) for name, times in stages.items() if times},
+        'cards_per_second': len(photos) / max(sum(stages['process_image']), 1e-12),
+        'detection_rate': len(corner_errors) / len(photos),
+        'statuses': statuses,
+        'corner_error_px': {'mean': float(np.mean(corner_errors)), 'p95': float(np.percentile(corner_errors, 95))} if corner_errors else None,
+        'roi_error_px': {'mean': float(np.mean(roi_errors)), 'p95': float(np.percentile(roi_errors, 95))} if roi_errors else None
+    }
+    for name, summary in results['stages'].items():
+        rotom.print_with_color(f"{name}: p50 {summary['p50_ms']:.2f} ms, p95 {summary['p95_ms']:.2f} ms", 4)
+    rotom.print_with_color(
+        f"{results['cards_per_second']:.1f} cards/s, {results['detection_rate']:.1%} detected, "
+        f"corner error {results['corner_error_px']['mean'] if corner_errors else float('nan'):.2f}px, "
+        f"ROI error {results['roi_error_px']['mean'] if roi_errors else float('nan'):.2f}px", 4)
+    return results
+
+def run_stages(args: argparse.Namespace) -> dict:
+    """
+    Benchmark every smeargle stage on varied synthetic photos of a defect's card layout.
+    """
+    config = rotom.parse_JSON_as_arguments('config.json', args.defect, ['dimensions', 'roi', 'roi_template', 'detection_max_side', 'refine_corners', 'warp', 'card_template'])
+    photos = synthetic_card_photos(args.cards, config.get('dimensions', (480, 680)), config.get('roi', (40, 45, 60, 60)),
+                                   config.get('roi_template', ''), tuple(args.photo_size), args.seed, max_rotation=args.max_rotation,
+                                   max_blur=args.max_blur, jpeg_quality=tuple(args.jpeg_quality), varied_backgrounds=True)
+    results = benchmark_stages(photos, config, args.search)
+    results['generator'] = {'seed': args.seed, 'photo_size': args.photo_size, 'max_rotation': args.max_rotation,
+                            'max_blur': args.max_blur, 'jpeg_quality': args.jpeg_quality}
+    return results
+
+def run_ncc(args: argparse.Namespace) -> dict:
+    """
+    Benchmark NCC refinement on synthetic aligned cards for a defect's ROI configuration.
+    """
+    config = rotom.parse_JSON_as_arguments('config.json', args.defect, ['dimensions', 'roi', 'roi_template'])
+    roi_box = config.get('roi', (40, 45, 60, 60))
+    roi_template = config.get('roi_template', '')
+    cards = synthetic_aligned_cards(args.cards, config.get('dimensions', (480, 680)), roi_box, roi_template, args.search)
+    return benchmark_ncc(cards, roi_box, roi_template, args.search)
+
+def run_resolution(args: argparse.Namespace) -> dict:
+    """
+    Crawl the configured queries of a defect and benchmark image sizes over the listings found.
+    """
+    config = rotom.parse_JSON_as_arguments('config.json', args.defect, ['queries', 'dimensions', 'roi', 'roi_template', 'detection_max_side', 'refine_corners', 'warp', 'card_template'])
+    CLIENT_ID, CLIENT_SECRET = rotom.enviromentals('EBAY_CLIENT_ID', 'EBAY_CLIENT_SECRET')
+    token = spinarak.get_ebay_token(CLIENT_ID, CLIENT_SECRET)
+    search_results, _ = spinarak.deduplicate_listings(spinarak.search_queries(token, list(config.get('queries', [])), price=args.price))
+    image_urls = [
+        item.get('image', {}).get('imageUrl', '')
+        for results in search_results.values()
+        for item in results.get('itemSummaries', [])
+        if item.get('image', {}).get('imageUrl', '')
+    ][:args.sample]
+    rotom.print_with_color(f"Benchmarking {len(image_urls)} listing images at sizes {args.sizes}...", 4)
+    return benchmark_resolution(image_urls, args.sizes, config)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the PokéPrint Inspector pipeline")
+    parser.add_argument("--output", type=str, default='', help="Write JSON results to this file instead of stdout")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    resolution = subparsers.add_parser('resolution', help="Compare eBay image size variants")
+    resolution.add_argument("--defect", type=str, required=True, help="Name of the Pokemon Card Defect")
+    resolution.add_argument("--price", type=float, default=50, help="Maximum listing price")
+    resolution.add_argument("--sizes", type=int, nargs='+', default=[500, 640, 800, 960, 1600], help="eBay size variants to compare")
+    resolution.add_argument("--sample", type=int, default=50, help="Maximum number of listings to download")
+    resolution.set_defaults(run=run_resolution)
+
+    ncc = subparsers.add_parser('ncc', help="Time single-pass NCC ROI refinement against the per-offset scan")
+    ncc.add_argument("--defect", type=str, required=True, help="Name of the Pokemon Card Defect")
+    ncc.add_argument("--cards", type=int, default=100, help="Number of synthetic cards")
+    ncc.add_argument("--search", type=int, default=8, help="Search radius in pixels")
+    ncc.set_defaults(run=run_ncc)
+
+    corners = subparsers.add_parser('corners', help="Compare coarse-to-fine corner detection with full resolution")
+    corners.add_argument("--defect", type=str, required=True, help="Name of the Pokemon Card Defect")
+    corners.add_argument("--cards", type=int, default=50, help="Number of synthetic photos")
+    corners.add_argument("--max_side", type=int, nargs='+', default=[480, 640, 800], help="Coarse detection sizes to compare")
+    corners.add_argument("--photo_size", type=int, nargs=2, default=[1600, 1200], help="Synthetic photo width and height")
+    corners.set_defaults(run=run_corners)
+
+    warp = subparsers.add_parser('warp', help="Time ROI-only perspective warps against full-card warps")
+    warp.add_argument("--defect", type=str, required=True, help="Name of the Pokemon Card Defect")
+    warp.add_argument("--cards", type=int, default=50, help="Number of synthetic photos")
+    warp.add_argument("--search", type=int, default=8, help="NCC search radius in pixels")
+    warp.add_argument("--photo_size", type=int, nargs=2, default=[1600, 1200], help="Synthetic photo width and height")
+    warp.set_defaults(run=run_warp)
+
+    orb = subparsers.add_parser('orb', help="Time cached-feature ORB alignment against per-call brute-force matching")
+    orb.add_argument("--defect", type=str, required=True, help="Name of the Pokemon Card Defect")
+    orb.add_argument("--cards", type=int, default=30, help="Number of synthetic photos")
+    orb.add_argument("--photo_size", type=int, nargs=2, default=[1600, 1200], help="Synthetic photo width and height")
+    orb.set_defaults(run=run_orb)
+
+    stages = subparsers.add_parser('stages', help="Time each smeargle stage and measure corner and ROI error on varied synthetic photos")
+    stages.add_argument("--defect", type=str, required=True, help="Name of the Pokemon Card Defect")
+    stages.add_argument("--cards", type=int, default=100, help="Number of synthetic photos")
+    stages.add_argument("--seed", type=int, default=0, help="Seed of the synthetic photo generator")
+    stages.add_argument("--search", type=int, default=8, help="NCC search radius in pixels")
+    stages.add_argument("--photo_size", type=int, nargs=2, default=[1600, 1200], help="Synthetic photo width and height")
+    stages.add_argument("--max_rotation", type=float, default=10.0, help="Largest in-plane card rotation in degrees")
+    stages.add_argument("--max_blur", type=float, default=1.5, help="Largest Gaussian blur sigma")
+    stages.add_argument("--jpeg_quality", type=int, nargs=2, default=[50, 95], help="Lowest and highest JPEG quality")
+    stages.set_defaults(run=run_stages)
+
+    args = parser.parse_args()
+    write_results(args.run(args), args.output)
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,14 @@
 Core model training and dataset management module for PokéPrint Inspector.
 
 This module handles:
-- Downloading datasets (including from Kaggle)
-- Loading and preprocessing image data
+- Downloading datasets (including from Kaggle) into a versioned local cache
+- Loading and preprocessing image data, from directories or straight from ZIP archives
+- Caching preprocessed datasets as memory-mapped arrays and streaming them through tf.data, split by filename
 - Splitting datasets into training and test sets
 - Building and training a Convolutional Neural Network (CNN) using Keras
 - Evaluating model performance
 - Visualizing predictions
+- Registering trained models by defect, dataset version and training config
 
 Dependencies:
 - OpenCV (cv2)
@@ -20,28 +22,55 @@ Dependencies:
 
 This module is intended to be called from the main execution pipeline and
 provides essential ML components for the PyPikachu project.
+
+TensorFlow, Keras and scikit-learn are imported by the functions that use them, so
+modules that only need the dataset helpers (and the OpenCV process-pool workers,
+which re-import the entry point) do not load them.
 """
 
+from __future__ import annotations
 import cv2
 import numpy as np
 import os
-from sklearn.model_selection import train_test_split
-from keras import layers, models, Input
+import io
+import re
+import csv
+import json
+import time
+import subprocess
+import hashlib
+import zipfile
+import threading
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, TYPE_CHECKING
 import rotom
 
-def get_dataset(author: str, dataset_name: str, download: bool) -> str:
+if TYPE_CHECKING:
+    import tensorflow as tf
+    from keras import models
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+LOAD_WORKERS = min(8, os.cpu_count() or 1)
+TEST_FRACTION = 0.2
+BATCH_SIZE = 32
+SHUFFLE_SEED = 42
+TENSOR_CACHE_DIR = os.path.join('processes', 'tensors')
+DATASET_CHECK_INTERVAL = 6 * 3600  # seconds between Kaggle version checks of a cached dataset
+DATASET_LOCK_TIMEOUT = 3600
+DATASET_LOCK_STALE = 120
+DOWNLOAD_ATTEMPTS = 3
+MODELS_DIR = os.path.join('processes', 'models')
+MODEL_REGISTRY = 'registry.json'
+MODEL_VERSION = 1  # bump whenever build_model or the training procedure changes
+
+_archives = threading.local()
+_loaded_models = {}
+_loaded_models_lock = threading.Lock()
+
+def datasets_dir() -> str:
     """
-    Download or extract a dataset, returning the directory path to the dataset.
-
-    Args:
-        - TRAINING_DIR (str): Path to save or load the dataset.
-        - author (str): Kaggle dataset author.
-        - dataset_name (str): Kaggle dataset name.
-        - download (bool): Whether to download from Kaggle.
-        - use_local_storage (bool): Whether to save Kaggle download locally.
-
-    Returns:
-    - str: Path to the dataset directory.
+    Return the datasets cache directory named by the DATASETS_DIR environment variable, creating it if needed.
     """
     script_dir = os.path.dirname(os.path.abspath(__file__))
     DATASETS_DIR = str(list(rotom.enviromentals('DATASETS_DIR')).pop())
@@ -50,80 +79,547 @@ def get_dataset(author: str, dataset_name: str, download: bool) -> str:
     try: os.makedirs(DATASETS_DIR, exist_ok=True)
     except PermissionError as e: rotom.print_with_color(f"Permission denied when creating datasets directory: {str(e)}", 1)
     except Exception as e: rotom.print_with_color(f"Unable to create datasets directory: {str(e)}", 1)
-    TRAINING_DIR = os.path.join(DATASETS_DIR, dataset_name)
-    TRAINING_DIR = os.path.expanduser(TRAINING_DIR)
-    if download:
+    return DATASETS_DIR
+
+def kaggle_credentials() -> None:
+    """
+    Write kaggle.json from KAGGLE_USERNAME and KAGGLE_KEY if the Kaggle CLI has no credentials yet.
+    """
+    (kaggle_dir_path,) = rotom.enviromentals('KAGGLE_CRED_DIR')
+    kaggle_dir_path = os.path.expanduser(kaggle_dir_path)
+    os.makedirs(kaggle_dir_path, exist_ok=True)
+    kaggle_cred_path = os.path.join(kaggle_dir_path, 'kaggle.json')
+    kaggle_cred_path = os.path.expanduser(kaggle_cred_path)
+    if not os.path.isfile(kaggle_cred_path):
+        with open(kaggle_cred_path, 'w') as f:
+            username, key = rotom.enviromentals('KAGGLE_USERNAME', 'KAGGLE_KEY')
+            f.write(f'{{"username":"{username}","key":"{key}"}}')
+
+def remote_dataset_version(author: str, dataset_name: str) -> str | None:
+    """
+    Ask Kaggle for the current version of a dataset without downloading it.
+
+    Args:
+        - author (str): Kaggle dataset author.
+        - dataset_name (str): Kaggle dataset name.
+
+    Returns:
+    - str | None: The dataset's last update time and size, or None if Kaggle could not be reached.
+    """
+    try:
+        result = subprocess.run(
+            ['kaggle', 'datasets', 'list', '--user', author, '--search', dataset_name, '--csv'],
+            capture_output=True, text=True, timeout=60)
+    except Exception as e:
+        rotom.print_with_color(f"Unable to query the version of {author}/{dataset_name}: {e}", 3)
+        return None
+    if result.returncode != 0:
+        rotom.print_with_color(f"Unable to query the version of {author}/{dataset_name}: {result.stderr.strip()}", 3)
+        return None
+    for row in csv.DictReader(io.StringIO(result.stdout)):
+        if row.get('ref') == f"{author}/{dataset_name}":
+            return f"{row.get('lastUpdated', '')}|{row.get('size', '')}"
+    return None
+
+def dataset_checksum(data_dir: str) -> str:
+    """
+    Return the SHA-256 of a dataset archive, or of every file in a dataset directory in path order.
+    """
+    digest = hashlib.sha256()
+    if os.path.isfile(data_dir):
+        with open(data_dir, 'rb') as fp:
+            for chunk in iter(lambda: fp.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    for root, dirs, files in os.walk(data_dir):
+        dirs.sort()
+        for file in sorted(files):
+            filepath = os.path.join(root, file)
+            digest.update(os.path.relpath(filepath, data_dir).replace(os.sep, '/').encode())
+            with open(filepath, 'rb') as fp:
+                for chunk in iter(lambda: fp.read(1 << 20), b''):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+def download_dataset(author: str, dataset_name: str, archive_path: str) -> bool:
+    """
+    Download a Kaggle dataset archive into a staging directory and move it to archive_path.
+
+    Args:
+        - author (str): Kaggle dataset author.
+        - dataset_name (str): Kaggle dataset name.
+        - archive_path (str): Path the dataset's ZIP archive is cached at.
+
+    Returns:
+    - bool: True if the dataset was downloaded.
+    """
+    staging = f"{archive_path}.part"
+    for attempt in range(1, DOWNLOAD_ATTEMPTS + 1):
+        if os.path.isdir(staging): rotom.clear_directory(staging)
+        rotom.print_with_color(f"Downloading {author}/{dataset_name} from Kaggle via CLI (attempt {attempt}/{DOWNLOAD_ATTEMPTS})", 4)
         try:
-            (kaggle_dir_path,) = rotom.enviromentals('KAGGLE_CRED_DIR')
-            kaggle_dir_path = os.path.expanduser(kaggle_dir_path)
-            os.makedirs(kaggle_dir_path, exist_ok=True)
-            kaggle_cred_path = os.path.join(kaggle_dir_path, 'kaggle.json')
-            kaggle_cred_path = os.path.expanduser(kaggle_cred_path)
-            if not os.path.isfile(kaggle_cred_path):
-                with open(kaggle_cred_path, 'w') as f:
-                    username, key = rotom.enviromentals('KAGGLE_USERNAME', 'KAGGLE_KEY')
-                    f.write(f'{{"username":"{username}","key":"{key}"}}')
-            rotom.print_with_color(f"Downloading {author}/{dataset_name} from Kaggle via CLI", 4)
-            os.system(f'kaggle datasets download -p {TRAINING_DIR} --unzip {author}/{dataset_name}')
+            result = subprocess.run(['kaggle', 'datasets', 'download', '-p', staging, f"{author}/{dataset_name}"], capture_output=True, text=True)
         except Exception as e:
-            rotom.print_with_color(f"Unable to download dataset: {str(e)}", 1)
-        else:
+            rotom.print_with_color(f"Unable to download dataset: {str(e)}", 3)
+            continue
+        downloaded = os.path.join(staging, f"{dataset_name}.zip")
+        if result.returncode == 0 and is_zip_dataset(downloaded):
+            os.replace(downloaded, archive_path)
+            rotom.clear_directory(staging)
             rotom.print_with_color("Dataset Download was successful!", 2)
-    else:
-        # Extract ZIP file if provided
-        if os.path.isfile(TRAINING_DIR) and TRAINING_DIR.endswith('.zip'):
-            TRAINING_DIR = rotom.extract_zipfile(TRAINING_DIR)
-    return TRAINING_DIR
+            return True
+        rotom.print_with_color(f"Unable to download dataset: {result.stderr.strip() or 'no archive was downloaded'}", 3)
+    if os.path.isdir(staging): rotom.clear_directory(staging)
+    return False
 
-def load_dataset_from_directory(data_dir: str, input_shape: tuple, USE_RGB: bool = True, USE_LOCAL_STORAGE: bool = False) -> tuple[list[cv2.typing.MatLike], list[int], list[str]]:
+def get_dataset(author: str, dataset_name: str, download: bool) -> str:
     """
-    Load and label images from a directory.
+    Return the dataset's ZIP archive in the DATASETS_DIR cache, downloading it only when it is stale.
+
+    The archive is kept between runs and read in place, never extracted. A '<name>.json' record next
+    to it holds its Kaggle version, checksum and member fingerprint. The cheap fingerprint is checked on
+    every call; at most once per DATASET_CHECK_INTERVAL the whole archive is also checked against its
+    checksum and Kaggle is asked for the current version. An archive that fails either check is
+    downloaded again. The whole check runs under a lock, kept fresh while it is held, so concurrent
+    workers download once.
 
     Args:
-        - data_dir (str): Directory containing images.
+        - author (str): Kaggle dataset author; ignored if dataset_name is a full 'author/name' reference.
+        - dataset_name (str): Kaggle dataset name or 'author/name' reference.
+        - download (bool): Whether to download from Kaggle when the cache is missing or stale.
+
+    Returns:
+    - str: Path to the dataset archive, or to a dataset directory provided by hand.
+    """
+    if '/' in dataset_name:
+        author, dataset_name = dataset_name.split('/', 1)
+    TRAINING_DIR = os.path.join(datasets_dir(), dataset_name)
+    archive_path = f"{TRAINING_DIR}.zip"
+    if not download:
+        return archive_path if os.path.isfile(archive_path) else TRAINING_DIR
+
+    record_path = f"{TRAINING_DIR}.json"
+    with rotom.file_lock(record_path, timeout=DATASET_LOCK_TIMEOUT, stale=DATASET_LOCK_STALE, refresh=True):
+        record = rotom.read_json(record_path, {})
+        intact = bool(record) and is_zip_dataset(archive_path) and dataset_version(archive_path) == record.get('fingerprint')
+        if intact and time.time() - record.get('checked', 0) < DATASET_CHECK_INTERVAL:
+            rotom.print_with_color(f"Using cached dataset {author}/{dataset_name} ({record.get('version')})", 4)
+            return archive_path
+        if intact and dataset_checksum(archive_path) != record.get('checksum'):
+            # The member list is unchanged but the bytes are not, e.g. a damaged or partly overwritten archive
+            rotom.print_with_color(f"Cached dataset {author}/{dataset_name} failed its checksum", 3)
+            intact = False
+        try: kaggle_credentials()
+        except Exception as e: rotom.print_with_color(f"Unable to set up Kaggle credentials: {str(e)}", 3)
+        version = remote_dataset_version(author, dataset_name)
+        if intact and (version is None or version == record.get('version')):
+            rotom.print_with_color(f"Cached dataset {author}/{dataset_name} is current ({record.get('version')})", 4)
+            record['checked'] = time.time()
+            rotom.write_json_atomic(record_path, record)
+            return archive_path
+        if not download_dataset(author, dataset_name, archive_path):
+            if is_zip_dataset(archive_path):
+                rotom.print_with_color(f"Keeping the previously cached {author}/{dataset_name}", 3)
+                return archive_path
+            rotom.print_with_color(f"Unable to download {author}/{dataset_name}", 1)
+        # Archives are read in place; drop any copy extracted by an older version of the cache
+        if os.path.isdir(TRAINING_DIR): rotom.clear_directory(TRAINING_DIR)
+        rotom.write_json_atomic(record_path, {
+            'ref': f"{author}/{dataset_name}",
+            'version': version,
+            'checksum': dataset_checksum(archive_path),
+            'fingerprint': dataset_version(archive_path),
+            'downloaded': time.time(),
+            'checked': time.time(),
+        })
+    return archive_path
+
+def load_dataset_from_directory(data_dir: str, input_shape: tuple, USE_RGB: bool = True, workers: int = LOAD_WORKERS) -> tuple[list[cv2.typing.MatLike], list[int], list[str]]:
+    """
+    Load and label images from a directory or ZIP archive, decoding them in parallel.
+
+    Images come back in filename order whatever the worker count; files that cannot be read,
+    resized or labelled are reported and left out of all three lists.
+
+    Args:
+        - data_dir (str): Directory or ZIP archive containing images.
         - input_shape (tuple): Target image shape (width, height).
         - USE_RGB (bool): Load as RGB or grayscale.
+        - workers (int): Number of decoding threads; 1 decodes on the calling thread.
 
     Returns:
     - tuple: (X images, y labels, filenames)
     """
-    rotom.print_with_color(f"Loading dataset from the directory '{data_dir}'...", 4)
+    rotom.print_with_color(f"Loading dataset from '{data_dir}'...", 4)
+    started = time.perf_counter()
     X = list(); y = list(); file_names = list()
+    errors = Counter()
     try:
-        for root, _, files in os.walk(data_dir):
-            for file in files:
-                file_names.append(os.path.join(root, file))
+        candidates = list_dataset_files(data_dir)
     except:
         rotom.print_with_color(f"Unable to traverse through '{data_dir}'", 1)
 
-    rotom.print_with_color(f"Reading images as {'RGB' if USE_RGB else 'Grayscale'}...", 4)
-    for filepath in file_names:
-        img = cv2.imread(filepath, cv2.IMREAD_COLOR) if USE_RGB else cv2.imread(filepath, cv2.IMREAD_GRAYSCALE)
-        if img is None:
-            rotom.print_with_color(f"Could not read image: {filepath}. Skipping...", 3)
+    labelled = list()
+    for filepath in candidates:
+        label = parse_label(filepath)
+        if label is None:
+            rotom.print_with_color(f"Could not extract label from filename: {filepath}", 3)
+            errors['bad label'] += 1
             continue
-        try:
-            img = cv2.resize(img, input_shape)
-        except:
+        labelled.append((filepath, label))
+
+    rotom.print_with_color(f"Reading images as {'RGB' if USE_RGB else 'Grayscale'} with {max(1, workers)} worker(s)...", 4)
+    for (filepath, label), (img, error) in zip(labelled, iter_images(data_dir, [filepath for filepath, _ in labelled], input_shape, USE_RGB, workers)):
+        if error == 'unreadable':
+            rotom.print_with_color(f"Could not read image: {filepath}. Skipping...", 3)
+        elif error == 'unresizable':
             rotom.print_with_color(f"Unable to resize the image {filepath}", 3)
+        if img is None:
+            errors[error] += 1
             continue
-        else:
-            X.append(img)
+        X.append(img); y.append(label); file_names.append(filepath)
 
-        try:
-            name, _ = os.path.splitext(file)
-            label = int(name.split('__')[1])
-            y.append(label)
-        except (IndexError, ValueError):
-            rotom.print_with_color(f"Could not extract label from filename: {file}", 3)
-            X.pop()
-            continue
-    if not USE_LOCAL_STORAGE:
-        rotom.print_with_color("Clearing local storage...", 4)
-        rotom.clear_directory(data_dir)
-        
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    rotom.print_with_color(f"Loaded {len(X)} images in {elapsed:.2f}s ({len(X) / elapsed:.1f} images/s)", 4)
+    if errors:
+        rotom.print_with_color(f"Skipped {sum(errors.values())} files: " + ", ".join(f"{count} {reason}" for reason, count in sorted(errors.items())), 3)
     return X, y, file_names
 
+def iter_images(data_dir: str, filepaths: list[str], input_shape: tuple, USE_RGB: bool = True, workers: int = LOAD_WORKERS) -> Iterator[tuple[cv2.typing.MatLike | None, str]]:
+    """
+    Decode and resize images on a thread pool, yielding the results in input order.
+
+    OpenCV releases the GIL while decoding and resizing, so threads scale across cores. At most
+    a few images per worker are in flight, so memory stays bounded however long the list is.
+
+    Args:
+        - data_dir (str): Directory or ZIP archive the images belong to.
+        - filepaths (list[str]): Image paths, or member names when data_dir is an archive.
+        - input_shape (tuple): Target image shape (width, height).
+        - USE_RGB (bool): Load as RGB or grayscale.
+        - workers (int): Number of decoding threads; 1 decodes on the calling thread.
+
+    Returns:
+    - Iterator: (resized image or None, failure reason) per path, see load_image.
+    """
+    if workers <= 1:
+        for filepath in filepaths:
+            yield load_image(data_dir, filepath, input_shape, USE_RGB)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for filepath in filepaths:
+            pending.append(pool.submit(load_image, data_dir, filepath, input_shape, USE_RGB))
+            if len(pending) >= workers * 4:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def is_zip_dataset(path: str) -> bool:
+    """
+    Return True if `path` is a ZIP archive rather than a dataset directory.
+    """
+    return os.path.isfile(path) and zipfile.is_zipfile(path)
+
+def list_zip_members(zip_path: str) -> list[str]:
+    """
+    List the image members of a ZIP archive in name order.
+
+    Args:
+        - zip_path (str): Path to the archive.
+
+    Returns:
+    - list[str]: Member names of the images.
+    """
+    with zipfile.ZipFile(zip_path) as archive:
+        return sorted(
+            info.filename for info in archive.infolist()
+            if not info.is_dir() and info.filename.lower().endswith(IMAGE_EXTENSIONS)
+            and not info.filename.startswith('__MACOSX/')
+        )
+
+def open_archive(zip_path: str) -> zipfile.ZipFile:
+    """
+    Return this thread's open handle on a ZIP archive, so parallel readers never share a file position.
+
+    Handles are keyed by the archive's modification time and size, so a re-downloaded archive is reopened.
+    """
+    handles = getattr(_archives, 'handles', None)
+    if handles is None:
+        handles = _archives.handles = {}
+    stat = os.stat(zip_path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    if zip_path in handles and handles[zip_path][0] != key:
+        handles.pop(zip_path)[1].close()
+    if zip_path not in handles:
+        handles[zip_path] = (key, zipfile.ZipFile(zip_path))
+    return handles[zip_path][1]
+
+def read_zip_member(zip_path: str, member: str) -> bytes:
+    """
+    Read the raw bytes of one archive member without extracting it.
+    """
+    return open_archive(zip_path).read(member)
+
+def read_zip_image(zip_path: str, member: str, USE_RGB: bool = True) -> cv2.typing.MatLike | None:
+    """
+    Decode one image straight from a ZIP archive.
+
+    Args:
+        - zip_path (str): Path to the archive.
+        - member (str): Member name of the image.
+        - USE_RGB (bool): Decode as colour or grayscale.
+
+    Returns:
+    - MatLike | None: Decoded image, or None if the member is missing or not a readable image.
+    """
+    try:
+        data = read_zip_member(zip_path, member)
+    except (KeyError, zipfile.BadZipFile, OSError):
+        return None
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR if USE_RGB else cv2.IMREAD_GRAYSCALE)
+
+def parse_label(filepath: str) -> int | None:
+    """
+    Parse the class label from the '__<label>' suffix of an image's filename.
+
+    Args:
+        - filepath (str): Path to a dataset image.
+
+    Returns:
+    - int | None: Label, or None if the filename carries none.
+    """
+    name, _ = os.path.splitext(os.path.basename(filepath))
+    try: return int(name.split('__')[1])
+    except (IndexError, ValueError): return None
+
+def is_test_file(filepath: str, test_fraction: float = TEST_FRACTION) -> bool:
+    """
+    Assign an image to the test split by a stable hash of its filename.
+
+    An image keeps its split when the dataset grows or is re-downloaded, so new images
+    never leak previously tested ones into training.
+
+    Args:
+        - filepath (str): Path to a dataset image.
+        - test_fraction (float): Share of filenames sent to the test split.
+
+    Returns:
+    - bool: True if the image belongs to the test split.
+    """
+    digest = hashlib.md5(os.path.basename(filepath).encode()).digest()
+    return int.from_bytes(digest[:4], 'big') / 2**32 < test_fraction
+
+def list_dataset_files(data_dir: str) -> list[str]:
+    """
+    List the images of a dataset directory, or the image members of a ZIP archive, in name order.
+    """
+    if is_zip_dataset(data_dir):
+        return list_zip_members(data_dir)
+    return sorted(os.path.join(root, file) for root, _, files in os.walk(data_dir) for file in files if file.lower().endswith(IMAGE_EXTENSIONS))
+
+def list_labelled_files(data_dir: str) -> tuple[list[str], list[int]]:
+    """
+    List the images of a dataset directory or ZIP archive together with their filename labels.
+
+    Args:
+        - data_dir (str): Directory or ZIP archive containing images.
+
+    Returns:
+    - tuple: (sorted file paths or archive member names, labels)
+    """
+    paths = list(); labels = list()
+    try:
+        for filepath in list_dataset_files(data_dir):
+            label = parse_label(filepath)
+            if label is None:
+                rotom.print_with_color(f"Could not extract label from filename: {filepath}", 3)
+                continue
+            paths.append(filepath)
+            labels.append(label)
+    except:
+        rotom.print_with_color(f"Unable to traverse through '{data_dir}'", 1)
+    return paths, labels
+
+def load_image(data_dir: str, filepath: str, input_shape: tuple, USE_RGB: bool = True) -> tuple[cv2.typing.MatLike | None, str]:
+    """
+    Decode and resize one dataset image from a directory or ZIP archive.
+
+    Args:
+        - data_dir (str): Directory or ZIP archive the image belongs to.
+        - filepath (str): Image path, or member name when data_dir is an archive.
+        - input_shape (tuple): Target image shape (width, height).
+        - USE_RGB (bool): Load as RGB or grayscale.
+
+    Returns:
+    - tuple: (resized image, or None if it failed; '' or the failure: 'unreadable' or 'unresizable')
+    """
+    if is_zip_dataset(data_dir):
+        img = read_zip_image(data_dir, filepath, USE_RGB)
+    else:
+        img = cv2.imread(filepath, cv2.IMREAD_COLOR) if USE_RGB else cv2.imread(filepath, cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        return None, 'unreadable'
+    try:
+        return cv2.resize(img, tuple(input_shape)), ''
+    except cv2.error:
+        return None, 'unresizable'
+
+def tensor_cache_path(data_dir: str, input_shape: tuple, USE_RGB: bool = True, cache_dir: str = TENSOR_CACHE_DIR) -> str:
+    """
+    Return the tensor cache directory of a dataset version, input shape and colour mode.
+    """
+    stem, _ = os.path.splitext(os.path.basename(os.path.normpath(data_dir)))
+    return os.path.join(cache_dir, f"{stem}_{dataset_version(data_dir)}_{input_shape[0]}x{input_shape[1]}_{'rgb' if USE_RGB else 'gray'}")
+
+def build_tensor_cache(data_dir: str, input_shape: tuple, USE_RGB: bool, cache_path: str, workers: int = LOAD_WORKERS) -> None:
+    """
+    Decode and resize every labelled image of a dataset once into a memory-mapped uint8 array.
+
+    The cache directory holds images.npy (N x height x width x channels), labels.npy and files.json,
+    the filename index. It is written to a staging directory and moved into place once complete.
+
+    Args:
+        - data_dir (str): Directory or ZIP archive containing images.
+        - input_shape (tuple): Target image shape (width, height).
+        - USE_RGB (bool): Load as RGB or grayscale.
+        - cache_path (str): Directory the cache is published at.
+        - workers (int): Number of decoding threads.
+    """
+    files, labels = list_labelled_files(data_dir)
+    if not files:
+        rotom.print_with_color("The images and/or labels are empty!", 1)
+    width, height = input_shape
+    channels = 3 if USE_RGB else 1
+    staging = f"{cache_path}.part"
+    if os.path.isdir(staging): rotom.clear_directory(staging)
+    os.makedirs(staging)
+    rotom.print_with_color(f"Building the tensor cache of {len(files)} images at {cache_path} with {max(1, workers)} worker(s)...", 4)
+    started = time.perf_counter()
+    images = np.lib.format.open_memmap(os.path.join(staging, 'images.npy'), mode='w+', dtype=np.uint8, shape=(len(files), height, width, channels))
+    kept = list()
+    errors = Counter()
+    for filepath, label, (img, error) in zip(files, labels, iter_images(data_dir, files, input_shape, USE_RGB, workers)):
+        if img is None:
+            rotom.print_with_color(f"Skipping {error} image: {filepath}", 3)
+            errors[error] += 1
+            continue
+        images[len(kept)] = img.reshape(height, width, channels)
+        kept.append((filepath, label))
+    images.flush()
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    rotom.print_with_color(f"Decoded {len(kept)} images in {elapsed:.2f}s ({len(kept) / elapsed:.1f} images/s)", 4)
+    if errors:
+        rotom.print_with_color(f"Skipped {sum(errors.values())} files: " + ", ".join(f"{count} {reason}" for reason, count in sorted(errors.items())), 3)
+    if len(kept) < len(files):
+        if not kept:
+            rotom.print_with_color("None of the dataset images could be read!", 1)
+        trimmed = np.lib.format.open_memmap(os.path.join(staging, 'trimmed.npy'), mode='w+', dtype=np.uint8, shape=(len(kept), height, width, channels))
+        for start in range(0, len(kept), BATCH_SIZE * 32):
+            stop = min(start + BATCH_SIZE * 32, len(kept))
+            trimmed[start:stop] = images[start:stop]
+        trimmed.flush()
+        del images, trimmed
+        os.replace(os.path.join(staging, 'trimmed.npy'), os.path.join(staging, 'images.npy'))
+    else:
+        del images
+    np.save(os.path.join(staging, 'labels.npy'), np.array([label for _, label in kept], dtype=np.int32))
+    rotom.write_json_atomic(os.path.join(staging, 'files.json'), [filepath for filepath, _ in kept])
+    if os.path.isdir(cache_path): rotom.clear_directory(cache_path)
+    os.replace(staging, cache_path)
+
+def open_tensor_cache(data_dir: str, input_shape: tuple, USE_RGB: bool = True, cache_dir: str = TENSOR_CACHE_DIR) -> tuple[np.ndarray, np.ndarray, list[str]]:
+    """
+    Open a dataset's preprocessed tensor cache, building it first if the dataset version has none.
+
+    Images are memory-mapped read-only, so opening costs no decoding and concurrent processes share
+    the pages through the OS page cache. A changed dataset has a new version and therefore a new
+    cache; caches of older versions with the same shape and colour mode are removed.
+
+    Args:
+        - data_dir (str): Directory or ZIP archive containing images.
+        - input_shape (tuple): Target image shape (width, height).
+        - USE_RGB (bool): Load as RGB or grayscale.
+        - cache_dir (str): Directory holding the tensor caches.
+
+    Returns:
+    - tuple: (memory-mapped uint8 images, labels, filenames)
+    """
+    cache_path = tensor_cache_path(data_dir, input_shape, USE_RGB, cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    with rotom.file_lock(cache_path, timeout=DATASET_LOCK_TIMEOUT, stale=DATASET_LOCK_STALE, refresh=True):
+        if not os.path.isfile(os.path.join(cache_path, 'files.json')):
+            build_tensor_cache(data_dir, input_shape, USE_RGB, cache_path)
+            stem, _, suffix = os.path.basename(cache_path).partition(f"_{dataset_version(data_dir)}_")
+            older = re.compile(rf"{re.escape(stem)}_[0-9a-f]{{12}}_{re.escape(suffix)}")
+            for entry in os.listdir(cache_dir):
+                stale = os.path.join(cache_dir, entry)
+                if entry != os.path.basename(cache_path) and older.fullmatch(entry) and os.path.isdir(stale):
+                    rotom.clear_directory(stale)
+    images = np.load(os.path.join(cache_path, 'images.npy'), mmap_mode='r')
+    labels = np.load(os.path.join(cache_path, 'labels.npy'))
+    files = rotom.read_json(os.path.join(cache_path, 'files.json'), [])
+    rotom.print_with_color(f"Opened the tensor cache of {len(files)} images at {cache_path}", 4)
+    return images, labels, files
+
+def make_tf_dataset(images: np.ndarray, labels: np.ndarray, indices: np.ndarray, batch_size: int = BATCH_SIZE, training: bool = True) -> tf.data.Dataset:
+    """
+    Build a streaming tf.data pipeline over rows of a memory-mapped tensor cache.
+
+    Only row indices live in the pipeline; each batch is gathered from the memory map when it is
+    needed, so memory stays bounded by the prefetch buffer rather than the dataset size.
+
+    Args:
+        - images (np.ndarray): Memory-mapped uint8 images.
+        - labels (np.ndarray): Labels aligned with images.
+        - indices (np.ndarray): Rows of images that belong to this dataset.
+        - batch_size (int): Images per batch.
+        - training (bool): Shuffle the rows every epoch.
+
+    Returns:
+    - tf.data.Dataset: Batches of (uint8 images, labels).
+    """
+    import tensorflow as tf
+
+    def gather(rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        return np.asarray(images[rows]), labels[rows]
+
+    def read(rows: tf.Tensor) -> tuple[tf.Tensor, tf.Tensor]:
+        batch, batch_labels = tf.numpy_function(gather, [rows], (tf.uint8, tf.int32))
+        batch.set_shape((None,) + images.shape[1:])
+        batch_labels.set_shape((None,))
+        return batch, batch_labels
+
+    dataset = tf.data.Dataset.from_tensor_slices(np.asarray(indices, dtype=np.int64))
+    if training:
+        dataset = dataset.shuffle(len(indices), seed=SHUFFLE_SEED, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size).map(read, num_parallel_calls=tf.data.AUTOTUNE)
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+def load_streaming_datasets(data_dir: str, input_shape: tuple, USE_RGB: bool = True, batch_size: int = BATCH_SIZE, cache_dir: str = TENSOR_CACHE_DIR) -> tuple[tf.data.Dataset, tf.data.Dataset, tuple[np.ndarray, np.ndarray, list[str]]]:
+    """
+    Split a dataset directory or ZIP archive by filename and stream both splits from its tensor cache.
+
+    Args:
+        - data_dir (str): Directory or ZIP archive containing images.
+        - input_shape (tuple): Target image shape (width, height).
+        - USE_RGB (bool): Load as RGB or grayscale.
+        - batch_size (int): Images per batch.
+        - cache_dir (str): Directory holding the tensor caches.
+
+    Returns:
+    - tuple: (training dataset, testing dataset, first testing batch as (images, labels, file paths))
+    """
+    rotom.print_with_color(f"Streaming dataset from '{data_dir}' as {'RGB' if USE_RGB else 'Grayscale'}...", 4)
+    images, labels, files = open_tensor_cache(data_dir, input_shape, USE_RGB, cache_dir)
+    split = np.array([is_test_file(filepath) for filepath in files], dtype=bool)
+    train, test = np.flatnonzero(~split), np.flatnonzero(split)
+    rotom.print_with_color(f"Training samples: {len(train)}, Test samples: {len(test)}", 4)
+    train_ds = make_tf_dataset(images, labels, train, batch_size, True)
+    test_ds = make_tf_dataset(images, labels, test, batch_size, False)
+    sample = test[:batch_size]
+    return train_ds, test_ds, (np.asarray(images[sample]), labels[sample], [files[i] for i in sample])
+
 def display_sample(X: list[cv2.typing.MatLike], y: list[int], file_names: list[str], sample_idx: int = 0) -> None:
     """
     Display a sample image and its label.
@@ -142,7 +638,7 @@ def display_sample(X: list[cv2.typing.MatLike], y: list[int], file_names: list[s
 
 def convert_and_reshape(origX: list[cv2.typing.MatLike], orig_y: list[int], USE_RGB: bool = True) -> tuple[np.ndarray, np.ndarray]:
     """
-    Convert image data to NumPy arrays, normalize, and reshape.
+    Convert image data to uint8 NumPy arrays and reshape; the model normalizes in-graph.
 
     Args:
         - origX (list): Original image data.
@@ -154,7 +650,7 @@ def convert_and_reshape(origX: list[cv2.typing.MatLike], orig_y: list[int], USE_
     """
     rotom.print_with_color("Converting and reshaping images...", 4)
     try:
-        X = np.array(origX, dtype=np.float32) / 255.0
+        X = np.array(origX, dtype=np.uint8)
         y = np.array(orig_y)
     except:
         rotom.print_with_color("Unable to convert list of MatLike objects to NumPy Array!", 1)
@@ -188,6 +684,8 @@ def split_dataset(X: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray,
     Returns:
     - tuple: (X_train, X_test, y_train, y_test)
     """
+    from sklearn.model_selection import train_test_split
+
     rotom.print_with_color("Splitting dataset into training and testing sets...", 4)
     try:
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -200,7 +698,7 @@ def split_dataset(X: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray,
 
 def build_model(num_classes: int, USE_RGB: bool = True) -> models.Sequential:
     """
-    Build and compile a simple CNN model.
+    Build and compile a simple CNN model that takes uint8-range images and rescales them in-graph.
 
     Args:
         - num_classes (int): Number of output classes.
@@ -209,10 +707,13 @@ def build_model(num_classes: int, USE_RGB: bool = True) -> models.Sequential:
     Returns:
     - models.Sequential: Compiled Keras model.
     """
+    from keras import layers, models, Input
+
     rotom.print_with_color("Building model...", 4)
     try:
         model = models.Sequential()
         model.add(Input(shape=(128, 128, 3)) if USE_RGB else Input(shape=(128, 128, 1)))
+        model.add(layers.Rescaling(1.0 / 255))
         model.add(layers.Conv2D(8, (3, 3), activation='relu'))
         model.add(layers.Flatten())
         model.add(layers.Dense(num_classes, activation='softmax'))
@@ -245,14 +746,36 @@ def train_model(model: models.Sequential, X_train: np.ndarray, y_train: np.ndarr
         rotom.print_with_color("Trained model successfully", 2)
     return history
 
-def evaluate_model(model: models.Sequential, X_test: np.ndarray, y_test: np.ndarray) -> None:
+def train_model_streaming(model: models.Sequential, train_ds: tf.data.Dataset, val_ds: tf.data.Dataset | None = None, epochs: int = 3):
+    """
+    Train the CNN model on a streaming tf.data dataset.
+
+    Args:
+        - model (models.Sequential): Keras model.
+        - train_ds (tf.data.Dataset): Batched training dataset.
+        - val_ds (tf.data.Dataset | None): Batched validation dataset.
+        - epochs (int): Number of passes over the training dataset.
+
+    Returns:
+    - History object: Keras training history.
+    """
+    rotom.print_with_color("Training model...", 4)
+    try:
+        history = model.fit(train_ds, epochs=epochs, validation_data=val_ds)
+    except Exception as e:
+        rotom.print_with_color(f"Model training failed. {e}", 1)
+    else:
+        rotom.print_with_color("Trained model successfully", 2)
+    return history
+
+def evaluate_model(model: models.Sequential, X_test: np.ndarray | tf.data.Dataset, y_test: np.ndarray | None = None) -> None:
     """
     Evaluate the model on test data.
 
     Args:
         - model (models.Sequential): Keras model.
-        - X_test (np.ndarray): Test images.
-        - y_test (np.ndarray): Test labels.
+        - X_test (np.ndarray | tf.data.Dataset): Test images, or a batched (images, labels) dataset.
+        - y_test (np.ndarray | None): Test labels; None when X_test is a dataset.
     """
     rotom.print_with_color("Evaluating model...", 4)
     test_loss, test_acc = model.evaluate(X_test, y_test)
@@ -301,6 +824,155 @@ def predict_and_visualize(model: models.Sequential, images: np.ndarray, labels:
 
     return np.array(final_preds), confidences
 
+def training_config(args: dict, USE_RGB: bool = True) -> dict:
+    """
+    Collect every setting that changes what a defect's classifier learns.
+
+    Args:
+        - args (dict): Defect configuration parsed from config.json.
+        - USE_RGB (bool): Whether the model takes RGB input.
+
+    Returns:
+    - dict: Training configuration used to key the model registry.
+    """
+    return {
+        'model_version': MODEL_VERSION,
+        'input_shape': list(args.get('input_shape', [128, 128])),
+        'num_classes': args.get('num_classes', 2),
+        'use_rgb': USE_RGB,
+        'test_fraction': TEST_FRACTION,
+        'batch_size': BATCH_SIZE,
+    }
+
+def config_hash(config: dict) -> str:
+    """
+    Return a short stable hash of a training configuration.
+    """
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()[:12]
+
+def dataset_version(data_dir: str) -> str:
+    """
+    Fingerprint a dataset directory by the names and sizes of its files, or a ZIP archive by its members' names and CRCs.
+
+    Args:
+        - data_dir (str): Directory or ZIP archive containing images.
+
+    Returns:
+    - str: Short hash that changes whenever a file is added, removed or replaced by one of another size (or content, for archives).
+    """
+    entries = list()
+    if is_zip_dataset(data_dir):
+        with zipfile.ZipFile(data_dir) as archive:
+            entries = [(info.filename, info.file_size, info.CRC) for info in archive.infolist() if not info.is_dir()]
+        return hashlib.sha1(json.dumps(sorted(entries)).encode()).hexdigest()[:12]
+    for root, _, files in os.walk(data_dir):
+        for file in files:
+            filepath = os.path.join(root, file)
+            try: entries.append((os.path.relpath(filepath, data_dir).replace(os.sep, '/'), os.path.getsize(filepath)))
+            except OSError: continue
+    return hashlib.sha1(json.dumps(sorted(entries)).encode()).hexdigest()[:12]
+
+def load_registered_model(defect: str, config: dict, version: str | None = None, models_dir: str = MODELS_DIR) -> models.Sequential | None:
+    """
+    Load a defect's registered model trained with `config`, keeping it in memory for later calls.
+
+    Args:
+        - defect (str): Defect the model classifies.
+        - config (dict): Training configuration from training_config.
+        - version (str | None): Required dataset version, or None for the newest registered one.
+        - models_dir (str): Directory of the registry and saved models.
+
+    Returns:
+    - models.Sequential | None: Registered model, or None if no matching model is registered.
+    """
+    from keras import models
+
+    registry = rotom.read_json(os.path.join(models_dir, MODEL_REGISTRY), {})
+    wanted = config_hash(config)
+    candidates = [
+        entry for entry in registry.values()
+        if entry.get('defect') == defect and entry.get('config_hash') == wanted
+        and (version is None or entry.get('dataset_version') == version)
+    ]
+    if not candidates:
+        return None
+    entry = max(candidates, key=lambda entry: entry.get('created', 0))
+    path = os.path.join(models_dir, entry['path'])
+    with _loaded_models_lock:
+        if path in _loaded_models:
+            return _loaded_models[path]
+    try:
+        model = models.load_model(path)
+    except Exception as e:
+        rotom.print_with_color(f"Unable to load the registered model '{path}': {e}", 3)
+        return None
+    rotom.print_with_color(f"Loaded the registered '{defect}' model (dataset {entry['dataset_version']}, config {wanted})", 2)
+    with _loaded_models_lock:
+        _loaded_models[path] = model
+    return model
+
+def model_key(model: models.Sequential, models_dir: str = MODELS_DIR) -> str:
+    """
+    Return the registry key of a model loaded or registered in this process.
+
+    Args:
+        - model (models.Sequential): Model returned by load_registered_model or register_model.
+        - models_dir (str): Directory of the registry and saved models.
+
+    Returns:
+    - str: '<defect>/<dataset version>/<config hash>', or '' if the model is not registered.
+    """
+    with _loaded_models_lock:
+        path = next((path for path, loaded in _loaded_models.items() if loaded is model), None)
+    if path is None:
+        return ''
+    defect, name = os.path.split(os.path.relpath(path, models_dir))
+    version, wanted = os.path.splitext(name)[0].rsplit('_', 1)
+    return f"{defect}/{version}/{wanted}"
+
+def register_model(model: models.Sequential, defect: str, config: dict, version: str, models_dir: str = MODELS_DIR) -> str:
+    """
+    Save a trained model and record it in the registry.
+
+    Args:
+        - model (models.Sequential): Trained Keras model.
+        - defect (str): Defect the model classifies.
+        - config (dict): Training configuration from training_config.
+        - version (str): Version of the dataset the model was trained on.
+        - models_dir (str): Directory of the registry and saved models.
+
+    Returns:
+    - str: Path of the saved model.
+    """
+    wanted = config_hash(config)
+    relative = os.path.join(defect, f"{version}_{wanted}.keras")
+    path = os.path.join(models_dir, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path[:-len('.keras')]}.{os.getpid()}.tmp.keras"
+    try:
+        model.save(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        rotom.print_with_color(f"Unable to save the '{defect}' model: {e}", 3)
+        return ''
+    registry_path = os.path.join(models_dir, MODEL_REGISTRY)
+    with rotom.file_lock(registry_path):
+        registry = rotom.read_json(registry_path, {})
+        registry[f"{defect}/{version}/{wanted}"] = {
+            'defect': defect,
+            'dataset_version': version,
+            'config_hash': wanted,
+            'config': config,
+            'path': relative,
+            'created': time.time(),
+        }
+        rotom.write_json_atomic(registry_path, registry)
+    with _loaded_models_lock:
+        _loaded_models[path] = model
+    rotom.print_with_color(f"Registered the '{defect}' model as {path}", 2)
+    return path
+
 def main(defect: str, use_local_storage: bool, use_rgb: bool, kaggle_download: bool, verbose: bool = False):
     args = rotom.parse_JSON_as_arguments(
         'config.json',
@@ -308,22 +980,19 @@ def main(defect: str, use_local_storage: bool, use_rgb: bool, kaggle_download: b
         ["input_shape", "dataset", "num_classes", "training_dir"])
     
     rotom.clear_terminal()
-    TRAINING_DIR = args.get('training_dir', '')
-
     TRAINING_DIR = get_dataset(
             args.get('author', 'benjaminadedowole'),
             args.get('dataset', 'wartortle-evolution-error'),
             kaggle_download,
             )
 
-    images, labels, filenames = load_dataset_from_directory(TRAINING_DIR, args.get('input_shape', [128, 128]), use_rgb, use_local_storage)
-    if verbose: display_sample(images, labels, filenames)
-    new_images, new_labels = convert_and_reshape(images, labels)
-    training_images, testing_images, training_labels, testing_labels = split_dataset(new_images, new_labels)
+    train_ds, test_ds, (testing_images, testing_labels, testing_files) = load_streaming_datasets(TRAINING_DIR, args.get('input_shape', [128, 128]), use_rgb)
+    if verbose: display_sample(list(testing_images), list(testing_labels), testing_files)
     AI = build_model(args.get('num_classes', 2), use_rgb)
-    train_model(AI, training_images, training_labels)
-    evaluate_model(AI, testing_images, testing_labels)
+    train_model_streaming(AI, train_ds)
+    evaluate_model(AI, test_ds)
     predict_and_visualize(AI, testing_images, testing_labels, use_rgb, verbose)
+    register_model(AI, defect, training_config(args, use_rgb), dataset_version(TRAINING_DIR))
     return AI
 
 if "__main__" == __name__:
@@ -5,6 +5,7 @@ Utility functions for the PokéPrint Inspector system.
 This module provides helper functions used across the project, including:
 - Colored terminal logging and message formatting
 - Directory and file validation (including dataset extraction)
+- Cross-process file locks and atomic JSON state files
 - Environment variable loading for external credentials
 - Argument parsing for main execution scripts
 - JSON configuration parsing to pass structured arguments
@@ -13,7 +14,7 @@ These utilities are designed to support the main PokéPrint pipeline,
 which involves crawling card listings, processing images, and running machine learning models.
 
 Dependencies:
-- Standard Python libraries only (os, time, zipfile, json, argparse)
+- Standard Python libraries only (os, time, zipfile, json, argparse, contextlib)
 
 Note:
 This module is intended to be imported by other scripts and should not
@@ -30,6 +31,9 @@ import cv2
 import zipfile
 import time
 import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
 
 def print_with_color(string: str, mode: int, quit: bool = True) -> None:
     """
@@ -91,15 +95,24 @@ def pause(seconds: float):
 
 def directory_check(data_dir: str) -> bool:
     """
-    Check if the directory contains any image files (jpg, png, jpeg).
+    Check if the directory, or ZIP archive, contains any image files (jpg, png, jpeg).
     
     Args:
-        - data_dir (str): The directory path to check.
+        - data_dir (str): The directory or ZIP archive path to check.
     
     Returns:
     - bool: True if image files are found, False otherwise.
     """
     file_names = []
+    if os.path.isfile(data_dir) and zipfile.is_zipfile(data_dir):
+        try:
+            with zipfile.ZipFile(data_dir) as archive:
+                file_names = [name for name in archive.namelist() if name.lower().endswith((".jpg", ".png", ".jpeg")) and not name.startswith("__MACOSX/")]
+        except Exception as e:
+            print_with_color(f"Unable to read the archive '{data_dir}': {e}", 1, False)
+            return False
+        print_with_color(f"Found {len(file_names)} images in {data_dir}", 4)
+        return len(file_names) > 0
     try:
         for root, _, files in os.walk(data_dir):
             for file in files:
@@ -150,6 +163,104 @@ def extract_zipfile(TRAINING_DIR: str) -> str:
         print_with_color("Dataset Extracted Successfully.", 2)
     return extract_to
 
+@contextmanager
+def file_lock(path: str, timeout: float = 60.0, stale: float = 300.0, refresh: bool = False):
+    """
+    Hold an exclusive lock on `path` across threads and processes.
+
+    The lock is a sibling '<path>.lock' file created atomically; a lock older
+    than `stale` seconds is assumed to belong to a dead process and is broken.
+    With `refresh`, a background thread touches the lock while it is held, so
+    a long critical section is not mistaken for a dead one.
+
+    Args:
+        - path (str): Path of the resource to lock.
+        - timeout (float): Seconds to wait for the lock before giving up.
+        - stale (float): Age in seconds after which an existing lock is broken.
+        - refresh (bool): Keep the lock fresh for as long as it is held.
+
+    Raises:
+    - TimeoutError: If the lock could not be acquired within `timeout`.
+    """
+    lock_path = f"{path}.lock"
+    os.makedirs(os.path.dirname(os.path.abspath(lock_path)), exist_ok=True)
+    deadline = time.time() + timeout
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > stale:
+                    os.remove(lock_path)
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.time() > deadline:
+                raise TimeoutError(f"Timed out waiting for lock '{lock_path}'")
+            time.sleep(0.05)
+        else:
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            break
+    released = threading.Event()
+
+    def heartbeat() -> None:
+        while not released.wait(stale / 4):
+            try:
+                os.utime(lock_path)
+            except FileNotFoundError:
+                return
+
+    if refresh:
+        threading.Thread(target=heartbeat, daemon=True).start()
+    try:
+        yield
+    finally:
+        released.set()
+        try:
+            os.remove(lock_path)
+        except FileNotFoundError:
+            pass
+
+def read_json(path: str, default=None):
+    """
+    Read a JSON state file, returning `default` if it is missing or corrupt.
+
+    Args:
+        - path (str): Path to the JSON file.
+        - default: Value returned when the file cannot be read.
+
+    Returns:
+    - The decoded JSON value, or `default`.
+    """
+    try:
+        with open(path, 'r') as fp:
+            return json.load(fp)
+    except (FileNotFoundError, json.JSONDecodeError, OSError):
+        return default
+
+def write_json_atomic(path: str, data, mode: int = 0o644) -> None:
+    """
+    Write a JSON state file atomically so readers never see a partial file.
+
+    Args:
+        - path (str): Destination path.
+        - data: JSON-serialisable value.
+        - mode (int): File permissions of the written file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as fp:
+            json.dump(data, fp)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
 def parse_JSON_as_arguments(file: str, defect: str, arg_template: list) -> dict:
     """
     Parse a JSON configuration file and extract arguments for a given defect.
@@ -187,12 +298,22 @@ def pass_arguments_to_main() -> argparse.Namespace:
     """
     parser = argparse.ArgumentParser(description="The core of PyPikachu model")
     parser.add_argument("--defect", type=str, help="Name of the Pokemon Card Defect", required=True)
-    parser.add_argument("--price", type=float, help="Maximum price you are willing to pay", required=True)
+    parser.add_argument("--price", type=float, help="Maximum price you are willing to pay (required unless --folder is given)")
     parser.add_argument("--use_local_storage", action='store_true', help="Use permanent local storage?")
     parser.add_argument("--use_rgb", action='store_true', help="Use RGB instead of grayscale?")
     parser.add_argument("--kaggle_download", action='store_true', help="Download Kaggle dataset")
     parser.add_argument("--verbose", action='store_true', help='Show a verbose output')
-    return parser.parse_args()
+    parser.add_argument("--incremental", action='store_true', help="Only fetch listings newer than the last crawl")
+    parser.add_argument("--full_resync", action='store_true', help="Ignore and rebuild the incremental crawl high-water marks")
+    parser.add_argument("--stream", action='store_true', help="Overlap downloading, alignment and inference in a streaming pipeline")
+    parser.add_argument("--debug", type=str, default='all', choices=['all', 'off', 'sampled', 'failures', 'async'], help="How per-card debug images are written")
+    parser.add_argument("--debug_every", type=int, default=10, help="Write debug images for every N-th card in 'sampled' mode")
+    parser.add_argument("--folder", type=str, default=None, help="Classify every card image under this folder instead of crawling eBay")
+    parser.add_argument("--manifest", type=str, default='', help="JSONL manifest of the folder run, resumed if it exists (default: <folder>/manifest.jsonl)")
+    args = parser.parse_args()
+    if args.folder is None and args.price is None:
+        parser.error("--price is required unless --folder is given")
+    return args
 
 def hash_function(itemId: str, price: float) -> str:
     encoded_defect = ''.join([str(ord(char)) for char in itemId])
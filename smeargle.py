@@ -3,14 +3,19 @@
 Image alignment and Region of Interest(ROI) extraction module for PokéPrint Inspector.
 
 This module processes Pokémon card images by:
-- Detecting card edges and contours
-- Applying perspective correction to deskew the card
-- Extracting the evolution portrait region (ROI) in the top-left
-- Saving debug images (original, edges, aligned, ROI) to structured folders
+- Detecting card edges and contours, optionally coarse-to-fine on a downscaled copy
+- Applying perspective correction to deskew the card, falling back to cached ORB template matching
+- Extracting the ROIs of several defects from a single card location
+- Extracting the evolution portrait region (ROI) in the top-left, refined against a cached template
+- Saving debug images (original, edges, aligned, ROI) to structured folders, either always,
+  never, for sampled or failed cards only, or asynchronously on a background thread
+- Spreading batches of cards over a process pool, exchanging images and ROIs through shared memory
+- Indexing classified photos by perceptual hash, so relisted and reused photos reuse their verdict
 
 Inputs:
-- Local image files from directory
-- Bytearray image data from online sources
+- Local image files from directory or from spinarak's image store
+- Bytearray image data from online sources, optionally gated on header dimensions and a
+  reduced-scale probe decode before being decoded at the smallest sufficient scale
 
 Outputs:
 - Debug and processed images saved in 'adjusted_images/<image-name>/'
@@ -28,7 +33,181 @@ import cv2
 import numpy as np
 import os
 from pathlib import Path
+import threading
+import time
+import queue
+import atexit
+from collections import Counter
+from typing import Callable
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
 import rotom
+import spinarak
+
+NCC_TIE_TOLERANCE = 1e-4
+DEFAULT_ROI_TEMPLATE = 'roi_templates/wartortle_evolution_error.jpg'
+
+ORB_FEATURES = 1500
+ORB_RATIO = 0.75
+ORB_MIN_INLIERS = 10
+CARD_MIN_AREA = 0.05
+CARD_ASPECT_TOLERANCE = 0.25
+DEDUP_DIR = os.path.join('processes', 'dedup')
+DEDUP_MAX_ENTRIES = 5000
+DEDUP_MAX_DISTANCE = 12
+DHASH_SIZE = 16
+DEBUG_EVERY = 10
+SHARED_BATCH_BYTES = 32 * 1024 * 1024
+
+_roi_templates: dict[tuple[str, int, int], np.ndarray] = {}
+_roi_templates_lock = threading.Lock()
+_card_features: dict[tuple[str, tuple], tuple[np.ndarray, np.ndarray] | None] = {}
+_card_features_lock = threading.Lock()
+_card_matchers = threading.local()
+_rejects: Counter = Counter()
+_rejects_lock = threading.Lock()
+_duplicate_indexes: dict[str, 'DuplicateIndex'] = {}
+_duplicate_indexes_lock = threading.Lock()
+_pool: ProcessPoolExecutor | None = None
+_pool_workers: int | None = None
+_pool_lock = threading.Lock()
+
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8
+}
+
+class DebugWriter:
+    """
+    Destination of the per-card debug images.
+
+    Modes:
+        - 'all': write every artifact of every card synchronously (the historical behaviour).
+        - 'off': write nothing; callers skip the copies made only for debugging.
+        - 'sampled': write only every `every`-th card.
+        - 'failures': keep a card's artifacts in memory and write them only if its status is not 'ok'.
+        - 'async': like 'all', but encode and write on a background thread through a bounded queue.
+    """
+    MODES = ('all', 'off', 'sampled', 'failures', 'async')
+
+    def __init__(self, mode: str = 'all', every: int = DEBUG_EVERY, queue_size: int = 64):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown debug mode '{mode}', expected one of {self.MODES}")
+        self.mode = mode
+        self.every = max(1, every)
+        self.cards = 0
+        self.lock = threading.Lock()
+        self.pending: dict[str, list[tuple[str, np.ndarray]]] = {}
+        self.queue: queue.Queue | None = None
+        self.thread: threading.Thread | None = None
+        if mode == 'async':
+            self.queue = queue.Queue(maxsize=queue_size)
+            self.thread = threading.Thread(target=self._drain, daemon=True)
+            self.thread.start()
+
+    def select(self, path: str) -> str:
+        """
+        Decide whether a new card gets debug output, returning its debug directory or ''.
+        """
+        if not path or self.mode == 'off':
+            return ''
+        if self.mode == 'sampled':
+            with self.lock:
+                self.cards += 1
+                if (self.cards - 1) % self.every:
+                    return ''
+        return path
+
+    def write(self, path: str, name: str, img: np.ndarray) -> None:
+        """
+        Write (or queue, or hold back) the artifact `name` of the card whose debug directory is `path`.
+        """
+        if not path or self.mode == 'off':
+            return
+        if self.mode == 'failures':
+            with self.lock:
+                self.pending.setdefault(path, []).append((name, img))
+        elif self.queue is not None:
+            self.queue.put((path, name, img))
+        else:
+            self._write(path, name, img)
+
+    def finish(self, path: str, status: str) -> None:
+        """
+        Close a card: in 'failures' mode its held-back artifacts are written only if `status` is not 'ok'.
+        """
+        with self.lock:
+            held = self.pending.pop(path, [])
+        if status != 'ok':
+            for name, img in held:
+                self._write(path, name, img)
+
+    def flush(self) -> None:
+        """
+        Block until every queued artifact has been written.
+        """
+        if self.queue is not None:
+            self.queue.join()
+
+    def _drain(self) -> None:
+        while True:
+            path, name, img = self.queue.get()
+            try:
+                self._write(path, name, img)
+            finally:
+                self.queue.task_done()
+
+    @staticmethod
+    def _write(path: str, name: str, img: np.ndarray) -> None:
+        try:
+            os.makedirs(path, exist_ok=True)
+            cv2.imwrite(os.path.join(path, name), img)
+        except (OSError, cv2.error) as e:
+            rotom.print_with_color(f"Unable to write debug image {os.path.join(path, name)}: {e}", 3)
+
+_debug = DebugWriter()
+
+def configure_debug(mode: str = 'all', every: int = DEBUG_EVERY, queue_size: int = 64) -> None:
+    """
+    Select how debug images are written for the rest of the run.
+
+    Args:
+        - mode (str): One of DebugWriter.MODES.
+        - every (int): In 'sampled' mode, write every N-th card.
+        - queue_size (int): In 'async' mode, maximum number of images waiting to be written.
+    """
+    global _debug
+    _debug.flush()
+    _debug = DebugWriter(mode, every, queue_size)
+
+def select_debug(path: str) -> str:
+    """
+    Decide whether a new card gets debug output under the current mode, returning its debug directory or ''.
+    """
+    return _debug.select(path)
+
+def write_debug(path: str, name: str, img: np.ndarray) -> None:
+    """
+    Write a debug artifact of a card selected with select_debug(), see DebugWriter.write().
+    """
+    _debug.write(path, name, img)
+
+def finish_debug(path: str, status: str) -> None:
+    """
+    Close a card the parent process wrote debug artifacts for, see DebugWriter.finish().
+    """
+    _debug.finish(path, status)
+
+def flush_debug() -> None:
+    """
+    Wait for pending asynchronous debug writes to finish.
+    """
+    _debug.flush()
 
 def order_points(pts: np.ndarray) -> np.ndarray:
     """
@@ -49,51 +228,176 @@ def order_points(pts: np.ndarray) -> np.ndarray:
     rect[3] = pts[np.argmax(diff)]   # Bottom-left
     return rect
 
-def load_file_from_directory(file: str, INPUT_DIR: str = 'images', OUTPUT_DIR: str = 'adjusted_images'):
+def load_file_from_directory(file: str, INPUT_DIR: str = 'images', OUTPUT_DIR: str = 'adjusted_images', image_url: str = '', gate: dict | None = None):
     """
     Load an image from a directory and prepare a save path for debug outputs.
 
     Args:
-        - file (str): Filename of the image.
-        - INPUT_DIR (str): Input directory path.
+        - file (str): Filename of the image, or the listing title when `image_url` is given.
+        - INPUT_DIR (str): Input directory path, or the root of the image store.
         - OUTPUT_DIR (str): Output directory for debug images.
+        - image_url (str): Listing image URL to look up in the image store under INPUT_DIR.
+        - gate (dict): Early-reject thresholds for gate_image(), or None to always decode at full size.
 
     Returns:
-    - tuple: (image matrix, save path string)
+    - tuple: (image matrix or None if it is missing, unreadable or was rejected, save path string or '' if this card gets no debug output)
     """
     file = file[:40].replace(' ', '_').replace('/', '-') + '.jpg'
-    image_path = os.path.join(INPUT_DIR, file)
+    image_path = spinarak.lookup_image(image_url, INPUT_DIR) if image_url else os.path.join(INPUT_DIR, file)
     image_name = Path(file).stem
-    save_path = os.path.join(OUTPUT_DIR, image_name)
-    os.makedirs(save_path, exist_ok=True)
+    save_path = _debug.select(os.path.join(OUTPUT_DIR, image_name))
 
     if not os.path.isfile(image_path):
-        rotom.print_with_color(f"File '{image_path}' does not exist", 1)
+        rotom.print_with_color(f"File '{image_path}' does not exist", 1, False)
+        return None, save_path
 
-    img = cv2.imread(image_path)
+    if gate is not None:
+        img, reason = gate_image(np.fromfile(image_path, dtype=np.uint8), gate)
+        if img is None:
+            rotom.print_with_color(f"Rejected image '{image_path}' before alignment: {reason}", 3)
+            return None, save_path
+    else:
+        img = cv2.imread(image_path)
     if img is None:
-        rotom.print_with_color(f"Could not load image: {image_path}", 1)
-        img = np.zeros((100, 100, 3), dtype=np.uint8)
-    cv2.imwrite(filename=os.path.join(save_path, "1_original.jpg"), img=img)
+        rotom.print_with_color(f"Could not load image: {image_path}", 1, False)
+        return None, save_path
+    _debug.write(save_path, "1_original.jpg", img)
     return img, save_path
 
-def load_file_from_bytearray(file: bytearray, save_path: str):
+def load_file_from_bytearray(file: bytearray, save_path: str, gate: dict | None = None):
     """
     Load an image from a bytearray (typically from web sources).
 
     Args:
         - file (bytearray): Raw image bytes.
         - save_path (str): Directory path to save debug outputs.
+        - gate (dict): Early-reject thresholds for gate_image(), or None to always decode at full size.
 
     Returns:
-    - tuple: (image matrix, save path string)
+    - tuple: (image matrix, as decoded by gate_image() when gated, or None if the bytes cannot be decoded or were rejected;
+      save path string, or '' if this card gets no debug output)
     """
-    image_bytes = np.frombuffer(file, dtype=np.uint8)
-    img = cv2.imdecode(image_bytes, cv2.IMREAD_COLOR)
-    if img is None:
-        rotom.print_with_color("Could not load image as bytes", 1)
+    if gate is not None:
+        img, reason = gate_image(file, gate)
+        if img is None:
+            rotom.print_with_color(f"Rejected image before alignment: {reason}", 3)
+            return None, ''
+    else:
+        image_bytes = np.frombuffer(file, dtype=np.uint8)
+        img = cv2.imdecode(image_bytes, cv2.IMREAD_COLOR) if image_bytes.size else None
+        if img is None:
+            rotom.print_with_color("Could not load image as bytes", 1, False)
+            return None, ''
+    save_path = _debug.select(save_path)
+    _debug.write(save_path, "1_original.jpg", img)
     return img, save_path
 
+def image_dimensions(data: bytes) -> tuple[int, int] | None:
+    """
+    Read the (width, height) of a JPEG or PNG from its header, without decoding any pixels.
+
+    Returns:
+    - tuple | None: (width, height), or None for other formats and truncated headers.
+    """
+    if data[:8] == b'\x89PNG\r\n\x1a\n' and data[12:16] == b'IHDR':
+        return int.from_bytes(data[16:20], 'big'), int.from_bytes(data[20:24], 'big')
+    if data[:2] != b'\xff\xd8':
+        return None
+    i = 2
+    while i + 9 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in JPEG_SOF_MARKERS:
+            return int.from_bytes(data[i + 7:i + 9], 'big'), int.from_bytes(data[i + 5:i + 7], 'big')
+        if marker == 0xDA:
+            return None
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            i += 2
+            continue
+        i += 2 + int.from_bytes(data[i + 2:i + 4], 'big')
+    return None
+
+def decode_scale(dimensions: tuple[int, int], long_side: int) -> int:
+    """
+    Pick the largest reduced-decode factor (1, 2, 4 or 8) that keeps the longest side at least `long_side` pixels.
+    """
+    if not long_side:
+        return 1
+    return next((factor for factor in (8, 4, 2) if max(dimensions) // factor >= long_side), 1)
+
+def gate_image(data: bytes | bytearray, gate: dict) -> tuple[np.ndarray | None, str]:
+    """
+    Reject hopeless images before alignment and decode the rest at a reduced scale where possible.
+
+    Checks run from cheapest to dearest: the header dimensions reject images
+    that are too small or too elongated to be a single card, then an
+    eighth-scale decode rejects nearly uniform images. Survivors are decoded
+    with the largest IMREAD_REDUCED_COLOR factor that keeps their longest side
+    at least `decode_long_side` pixels. Every rejection is counted by reason.
+
+    Args:
+        - data (bytes): Encoded image.
+        - gate (dict): Thresholds: 'min_side' (pixels), 'max_aspect' (long/short side),
+          'blank_std' (grey-level standard deviation) and 'decode_long_side' (pixels, 0 decodes at full size).
+
+    Returns:
+    - tuple: (decoded image, 'ok') or (None, reason), where reason is 'empty', 'undecodable',
+      'too_small', 'bad_aspect' or 'blank'.
+    """
+    def reject(reason: str) -> tuple[None, str]:
+        with _rejects_lock:
+            _rejects[reason] += 1
+        return None, reason
+
+    if not len(data):
+        return reject('empty')
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    dimensions = image_dimensions(bytes(data[:65536]))
+    if dimensions is None:
+        # Unknown header: decode fully and apply the size checks to the pixels instead
+        img = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+        if img is None:
+            return reject('undecodable')
+        dimensions = (img.shape[1], img.shape[0])
+    else:
+        img = None
+
+    short, long = sorted(dimensions)
+    if short < gate.get('min_side', 0):
+        return reject('too_small')
+    if short == 0 or long / short > gate.get('max_aspect', float('inf')):
+        return reject('bad_aspect')
+
+    scale = decode_scale(dimensions, gate.get('decode_long_side', 0)) if img is None else 1
+    probe = img if img is not None else cv2.imdecode(buffer, REDUCED_DECODE_FLAGS[8])
+    if probe is None:
+        return reject('undecodable')
+    if float(cv2.cvtColor(probe, cv2.COLOR_BGR2GRAY).std()) < gate.get('blank_std', 0):
+        return reject('blank')
+    if img is None:
+        img = probe if scale == 8 else cv2.imdecode(buffer, REDUCED_DECODE_FLAGS[scale])
+    if img is None:
+        return reject('undecodable')
+    return img, 'ok'
+
+def reject_counts() -> dict[str, int]:
+    """
+    Return how many images gate_image() rejected, by reason, since the last reset.
+    """
+    with _rejects_lock:
+        return dict(_rejects)
+
+def reset_reject_counts() -> None:
+    """
+    Zero the gate_image() reject counters.
+    """
+    with _rejects_lock:
+        _rejects.clear()
+
 def detect_edges(img: cv2.typing.MatLike, path: str) -> cv2.typing.MatLike:
     """
     Convert an image to grayscale, apply blur, and detect edges using Canny.
@@ -109,19 +413,71 @@ def detect_edges(img: cv2.typing.MatLike, path: str) -> cv2.typing.MatLike:
     blur = cv2.GaussianBlur(gray, (5, 5), 0)
     edges = cv2.Canny(blur, 50, 150)
 
-    if path: cv2.imwrite(os.path.join(path, "2_edges.jpg"), edges)
+    _debug.write(path, "2_edges.jpg", edges)
     return edges
 
-def detect_contours(img: cv2.typing.MatLike, edges: cv2.typing.MatLike) -> cv2.typing.MatLike:
+def detect_contours(img: cv2.typing.MatLike, edges: cv2.typing.MatLike, max_side: int = 0, refine: bool = False) -> cv2.typing.MatLike:
     """
     Detect the largest external contour in an edge image.
+
+    With `max_side`, the quadrilateral is searched on a copy downscaled by an
+    integer factor so its longest side is at most `max_side` pixels, and the corners are scaled back
+    to full resolution. With `refine`, those corners are then refined to
+    sub-pixel accuracy on the full-resolution image.
     
     Args:
         - img (MatLike): Image to be processed.
-        - edges (MatLike): Binary edge map.
+        - edges (MatLike): Binary edge map; unused, as the border and fallback edges are found on the detection image itself.
+        - max_side (int): Longest side of the coarse detection image; 0 detects at full resolution.
+        - refine (bool): Refine coarse corners with sub-pixel corner refinement.
 
     Returns:
-    - np.ndarray: Approximated polygon contour points.
+    - np.ndarray: Approximated polygon contour points (float32 when scaled back from a coarse detection).
+    """
+    longest = max(img.shape[:2])
+    if not max_side or longest <= max_side:
+        return _find_card_quad(img)
+
+    # Integer factors keep INTER_AREA on its fast block-averaging path.
+    scale = 1.0 / int(np.ceil(longest / max_side))
+    small = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    approx = _find_card_quad(small)
+    if len(approx) != 4:
+        return approx
+    corners = approx.reshape(-1, 1, 2).astype(np.float32) / scale
+    if refine:
+        corners = refine_corners(img, corners, max(3, int(round(1.5 / scale))))
+    return corners
+
+def refine_corners(img: cv2.typing.MatLike, corners: np.ndarray, window: int = 5) -> np.ndarray:
+    """
+    Refine approximate card corners to sub-pixel accuracy on the full-resolution image.
+
+    Args:
+        - img (MatLike): Full-resolution BGR image.
+        - corners (np.ndarray): float32 corners of shape (N, 1, 2).
+        - window (int): Half-size of the search window in pixels.
+
+    Returns:
+    - np.ndarray: Refined float32 corners of the same shape; unrefined if a corner drifts out of its window.
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    height, width = gray.shape
+    refined = corners.copy()
+    margin = window + 1
+    inside = ((refined[:, 0, 0] >= margin) & (refined[:, 0, 0] < width - margin) &
+              (refined[:, 0, 1] >= margin) & (refined[:, 0, 1] < height - margin))
+    if not inside.any():
+        return corners
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.01)
+    refined[inside] = cv2.cornerSubPix(gray, np.ascontiguousarray(refined[inside]), (window, window), (-1, -1), criteria)
+    drift = np.abs(refined - corners).max(axis=(1, 2))
+    refined[drift > window] = corners[drift > window]
+    return refined
+
+def _find_card_quad(img: cv2.typing.MatLike) -> cv2.typing.MatLike:
+    """
+    Find the card quadrilateral from its yellow border, falling back to the largest edge contour.
     """
     hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
 
@@ -181,56 +537,243 @@ def draw_contours(img: cv2.typing.MatLike, approx: cv2.typing.MatLike, save_path
     Returns:
     - MatLike: Aligned, deskewed image.
     """
-    pts = approx.reshape(4, 2)
-    CARD_WIDTH, CARD_HEIGHT = CARD_DIM
+    draw_quad(img, approx, save_path)
+    return align_card(img, card_homography(approx.reshape(4, 2), CARD_DIM), save_path, CARD_DIM)
 
-    # Save contour overlay
-    debug_img = img.copy()
-    cv2.drawContours(debug_img, [approx], -1, (0, 255, 0), 3)
-    if save_path:
-        cv2.imwrite(os.path.join(save_path, "3_contour.jpg"), debug_img)
+def draw_quad(img: cv2.typing.MatLike, approx: cv2.typing.MatLike, save_path: str) -> None:
+    """
+    Save the detected card outline drawn over the photo, if this card gets debug output.
+    """
+    if save_path and _debug.mode != 'off':
+        debug_img = img.copy()
+        cv2.drawContours(debug_img, [np.round(approx).astype(np.int32)], -1, (0, 255, 0), 3)
+        _debug.write(save_path, "3_contour.jpg", debug_img)
 
-    # Apply perspective warp
-    rect = order_points(pts)
-    dst = np.array([[0, 0], [CARD_WIDTH - 1, 0], [CARD_WIDTH - 1, CARD_HEIGHT - 1], [0, CARD_HEIGHT - 1]], dtype="float32")
-    M = cv2.getPerspectiveTransform(rect, dst)
-    aligned = cv2.warpPerspective(img, M, (CARD_WIDTH, CARD_HEIGHT), flags=cv2.INTER_LANCZOS4)
-    if save_path:
-        cv2.imwrite(os.path.join(save_path, "4_aligned.jpg"), aligned)
+def align_card(img: cv2.typing.MatLike, M: np.ndarray, save_path: str, CARD_DIM: tuple[int, int]) -> np.ndarray:
+    """
+    Warp the whole card with its homography.
+    """
+    aligned = cv2.warpPerspective(img, M, tuple(CARD_DIM), flags=cv2.INTER_LANCZOS4)
+    _debug.write(save_path, "4_aligned.jpg", aligned)
     return aligned
 
-def align_with_orb(img, template, out_wh):
-    h, w = out_wh[1], out_wh[0]
-    orb = cv2.ORB.create(1500)
-    kp1, des1 = orb.detectAndCompute(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), np.array([]))
-    kp2, des2 = orb.detectAndCompute(cv2.cvtColor(template, cv2.COLOR_BGR2GRAY),  np.array([]))
-    if des1 is None or des2 is None: return None
-    bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=False)
-    matches = sorted(bf.match(des1, des2), key=lambda m: m.distance)[:200]
-    if len(matches) < 10: return None
-    src = np.array([kp1[m.queryIdx].pt for m in matches], dtype=np.float32).reshape(-1,1,2)
-    dst = np.array([kp2[m.trainIdx].pt for m in matches], dtype=np.float32).reshape(-1,1,2)
+def card_homography(pts: np.ndarray, CARD_DIM: tuple[int, int]) -> np.ndarray:
+    """
+    Compute the homography that maps the card corners onto an upright CARD_DIM card.
+
+    Args:
+        - pts (np.ndarray): Array of shape (4, 2) with unordered card corners.
+        - CARD_DIM (tuple): Target card dimensions (width, height).
+
+    Returns:
+    - np.ndarray: 3x3 perspective transform.
+    """
+    CARD_WIDTH, CARD_HEIGHT = CARD_DIM
+    rect = order_points(pts.reshape(4, 2))
+    dst = np.array([[0, 0], [CARD_WIDTH - 1, 0], [CARD_WIDTH - 1, CARD_HEIGHT - 1], [0, CARD_HEIGHT - 1]], dtype="float32")
+    return cv2.getPerspectiveTransform(rect, dst)
+
+def roi_window(roi_box: tuple[int, int, int, int], CARD_DIM: tuple[int, int], search: int = 8) -> tuple[int, int, int, int]:
+    """
+    Return the part of the aligned card that ROI refinement can read: the ROI box grown by `search`, clipped to the card.
+    """
+    x, y, w, h = roi_box
+    CARD_WIDTH, CARD_HEIGHT = CARD_DIM
+    x0, y0 = max(0, x - search), max(0, y - search)
+    x1, y1 = min(CARD_WIDTH, x + w + search), min(CARD_HEIGHT, y + h + search)
+    return x0, y0, max(0, x1 - x0), max(0, y1 - y0)
+
+def warp_window(img: cv2.typing.MatLike, M: np.ndarray, window: tuple[int, int, int, int]) -> np.ndarray:
+    """
+    Warp only a window of the aligned card, using the card homography shifted to the window's origin.
+
+    Args:
+        - img (MatLike): Input image matrix.
+        - M (np.ndarray): Card homography from card_homography().
+        - window (tuple): (x, y, width, height) of the window in aligned-card coordinates.
+
+    Returns:
+    - np.ndarray: The window, as it would appear cropped from the fully warped card.
+    """
+    x0, y0, w, h = window
+    shift = np.array([[1, 0, -x0], [0, 1, -y0], [0, 0, 1]], dtype=np.float64)
+    return cv2.warpPerspective(img, shift @ M, (w, h), flags=cv2.INTER_LANCZOS4)
+
+def load_card_features(card_template_path: str, CARD_DIM: tuple[int, int]) -> tuple[np.ndarray, np.ndarray] | None:
+    """
+    Compute ORB keypoints and descriptors of a defect's upright card template once, caching them for every later card.
+
+    The template is resized to CARD_DIM, so homographies found against it map
+    straight onto the aligned card.
+
+    Args:
+        - card_template_path (str): Path to an upright, uncropped image of the card.
+        - CARD_DIM (tuple): Target card dimensions (width, height).
+
+    Returns:
+    - tuple: (keypoint coordinates of shape (N, 2), descriptors), or None if the template is unreadable or featureless.
+    """
+    key = (card_template_path, tuple(CARD_DIM))
+    with _card_features_lock:
+        if key in _card_features:
+            return _card_features[key]
+    template = cv2.imread(card_template_path, cv2.IMREAD_GRAYSCALE)
+    features = None
+    if template is not None:
+        template = cv2.resize(template, tuple(CARD_DIM), interpolation=cv2.INTER_AREA)
+        keypoints, descriptors = cv2.ORB.create(ORB_FEATURES).detectAndCompute(template, None)
+        if descriptors is not None and len(keypoints) >= ORB_MIN_INLIERS:
+            features = (np.float32([kp.pt for kp in keypoints]), descriptors)
+    if features is None:
+        rotom.print_with_color(f"Card template '{card_template_path}' has no usable ORB features; ORB alignment is disabled for it", 3)
+    with _card_features_lock:
+        _card_features[key] = features
+    return features
+
+def _card_matcher(card_template_path: str, CARD_DIM: tuple[int, int], descriptors: np.ndarray) -> cv2.FlannBasedMatcher:
+    """
+    Return this thread's LSH index over a card template's descriptors, building it on first use.
+
+    FLANN matchers are not thread-safe, so each alignment thread keeps its own.
+    """
+    matchers = _card_matchers.__dict__.setdefault('matchers', {})
+    key = (card_template_path, tuple(CARD_DIM))
+    if key not in matchers:
+        matcher = cv2.FlannBasedMatcher(dict(algorithm=6, table_number=6, key_size=12, multi_probe_level=1), dict(checks=50))
+        matcher.add([descriptors])
+        matcher.train()
+        matchers[key] = matcher
+    return matchers[key]
+
+def orb_homography(img: cv2.typing.MatLike, card_template_path: str, CARD_DIM: tuple[int, int], max_side: int = 0) -> np.ndarray | None:
+    """
+    Estimate the card homography from ORB features when the card quadrilateral cannot be found.
+
+    Image descriptors are matched against the cached template index with an
+    LSH approximate nearest-neighbour search and Lowe's ratio test, then the
+    homography is fitted with RANSAC.
+
+    Args:
+        - img (MatLike): Input image matrix.
+        - card_template_path (str): Path to an upright, uncropped image of the card.
+        - CARD_DIM (tuple): Target card dimensions (width, height).
+        - max_side (int): Detect image features on a copy at most this large; 0 uses full resolution.
+
+    Returns:
+    - np.ndarray | None: 3x3 transform from the image onto the aligned card, or None if alignment failed.
+    """
+    features = load_card_features(card_template_path, CARD_DIM)
+    if features is None:
+        return None
+    template_points, template_descriptors = features
+
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    scale = 1.0
+    if max_side and max(gray.shape) > max_side:
+        scale = 1.0 / int(np.ceil(max(gray.shape) / max_side))
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    keypoints, descriptors = cv2.ORB.create(ORB_FEATURES).detectAndCompute(gray, None)
+    if descriptors is None or len(keypoints) < ORB_MIN_INLIERS:
+        return None
+
+    matches = _card_matcher(card_template_path, CARD_DIM, template_descriptors).knnMatch(descriptors, k=2)
+    good = [pair[0] for pair in matches if len(pair) == 2 and pair[0].distance < ORB_RATIO * pair[1].distance]
+    if len(good) < ORB_MIN_INLIERS:
+        return None
+    src = np.float32([keypoints[m.queryIdx].pt for m in good]).reshape(-1, 1, 2) / scale
+    dst = template_points[[m.trainIdx for m in good]].reshape(-1, 1, 2)
     H, mask = cv2.findHomography(src, dst, cv2.RANSAC, 5.0)
-    if H is None: return None
-    return cv2.warpPerspective(img, H, (w, h), flags=cv2.INTER_LANCZOS4)
+    if H is None or int(mask.sum()) < ORB_MIN_INLIERS:
+        return None
+    return H
+
+def align_with_orb(img: cv2.typing.MatLike, card_template_path: str, CARD_DIM: tuple[int, int], save_path: str = '') -> np.ndarray | None:
+    """
+    Align and deskew the card by ORB feature matching against its card template.
+
+    Args:
+        - img (MatLike): Input image matrix.
+        - card_template_path (str): Path to an upright, uncropped image of the card.
+        - CARD_DIM (tuple): Target card dimensions (width, height).
+        - save_path (str): Directory to save aligned image.
+
+    Returns:
+    - MatLike | None: Aligned, deskewed image, or None if alignment failed.
+    """
+    H = orb_homography(img, card_template_path, CARD_DIM)
+    return align_card(img, H, save_path, CARD_DIM) if H is not None else None
+
+def load_roi_template(roi_template_path: str, w: int, h: int) -> np.ndarray:
+    """
+    Load an ROI template as grayscale, caching it for every later card.
+
+    Templates larger than the (w, h) ROI box are resized to it, since a
+    template must fit inside the patch it is matched against.
+
+    Args:
+        - roi_template_path (str): Path to the defect's ROI template image.
+        - w (int): ROI box width.
+        - h (int): ROI box height.
+
+    Returns:
+    - np.ndarray: Grayscale template, blank if the file cannot be read.
+    """
+    key = (roi_template_path, w, h)
+    with _roi_templates_lock:
+        if key in _roi_templates:
+            return _roi_templates[key]
+    template = cv2.imread(roi_template_path, cv2.IMREAD_COLOR)
+    if template is None:
+        template = np.zeros((h, w, 3), dtype=np.uint8)
+    template = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+    if template.shape[0] > h or template.shape[1] > w:
+        template = cv2.resize(template, (w, h), interpolation=cv2.INTER_AREA)
+    with _roi_templates_lock:
+        _roi_templates[key] = template
+    return template
 
 def refine_roi_by_ncc(aligned, roi_box, roi_template_path, search=8):
-    x,y,w,h = roi_box
-    roi_template = cv2.imread(roi_template_path, cv2.IMREAD_COLOR) or np.zeros((h, w, 3), dtype=np.uint8)
-    best, best_off = -1.0, (0,0)
-    for dy in range(-search, search+1):
-        for dx in range(-search, search+1):
-            xs, ys = x+dx, y+dy
-            patch = aligned[ys:ys+h, xs:xs+w]
-            if patch.shape[:2] != (h,w): continue
-            res = cv2.matchTemplate(cv2.cvtColor(patch, cv2.COLOR_BGR2GRAY),
-                                    cv2.cvtColor(roi_template, cv2.COLOR_BGR2GRAY),
-                                    cv2.TM_CCOEFF_NORMED)
-            score = float(res.max())
-            if score > best:
-                best, best_off = score, (dx,dy)
-    dx,dy = best_off
-    return (x+dx, y+dy, w, h), best
+    """
+    Shift the ROI box by up to `search` pixels to where it best matches the ROI template.
+
+    A single matchTemplate call covers the whole search window. The score of
+    each offset is the best normalised cross-correlation of the template
+    anywhere inside the box at that offset. Offsets whose box leaves the
+    image are skipped, and ties go to the first offset in row-major order.
+
+    Args:
+        - aligned (MatLike): Aligned card image.
+        - roi_box (tuple): (x, y, width, height) of the nominal ROI.
+        - roi_template_path (str): Path to the defect's ROI template image.
+        - search (int): Maximum shift in pixels along each axis.
+
+    Returns:
+    - tuple: (refined (x, y, width, height), best score or -1.0 if no offset fits)
+    """
+    x, y, w, h = roi_box
+    template = load_roi_template(roi_template_path, w, h)
+    th, tw = template.shape[:2]
+    height, width = aligned.shape[:2]
+
+    dx0, dx1 = max(-search, -x), min(search, width - w - x)
+    dy0, dy1 = max(-search, -y), min(search, height - h - y)
+    if dx0 > dx1 or dy0 > dy1:
+        return (x, y, w, h), -1.0
+
+    window = cv2.cvtColor(aligned[y+dy0:y+dy1+h, x+dx0:x+dx1+w], cv2.COLOR_BGR2GRAY)
+    scores = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+    if (th, tw) != (h, w):
+        # Best match anywhere inside the box placed at each offset
+        scores = cv2.dilate(scores, np.ones((h - th + 1, w - tw + 1), np.uint8), anchor=(0, 0))
+    scores = np.nan_to_num(scores[:dy1 - dy0 + 1, :dx1 - dx0 + 1], nan=-1.0)
+
+    # Scores within rounding noise of the maximum are ties; keep the first, as a per-offset scan would
+    first = int(np.flatnonzero(scores.ravel() >= scores.max() - NCC_TIE_TOLERANCE)[0])
+    row, col = np.unravel_index(first, scores.shape)
+    best = float(scores[row, col])
+    if best <= -1.0:
+        return (x, y, w, h), -1.0
+    return (x + dx0 + int(col), y + dy0 + int(row), w, h), best
 
 def robust_roi(aligned, path, ROI_BOX, ROI_TEMPLATE, search=8):
     # 1) optional local refinement
@@ -247,18 +790,15 @@ def robust_roi(aligned, path, ROI_BOX, ROI_TEMPLATE, search=8):
 
     # 3) quality gates (simple examples)
     if cv2.Laplacian(cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY), cv2.CV_64F).var() < 20:
-        if path:
-            cv2.imwrite(os.path.join(path, "6_roi_blurry.jpg"), roi)
+        _debug.write(path, "6_roi_blurry.jpg", roi)
         return roi, score, "blurry"
     if score < 0.6:
-        if path:
-            cv2.imwrite(os.path.join(path, "6_roi_low_template_match.jpg"), roi)
+        _debug.write(path, "6_roi_low_template_match.jpg", roi)
         return roi, score, "low_template_match"
-    if path:
-            cv2.imwrite(os.path.join(path, "6_roi.jpg"), roi)
+    _debug.write(path, "6_roi.jpg", roi)
     return roi, score, "ok"
 
-def roi_extraction(aligned: np.ndarray, path: str, ROI_BOX: tuple[int, int, int, int], ROI_TEMPLATE: str = 'roi_templates/wartortle_evolution_error.jpg', search: int = 8):
+def roi_extraction(aligned: np.ndarray, path: str, ROI_BOX: tuple[int, int, int, int], ROI_TEMPLATE: str = DEFAULT_ROI_TEMPLATE, search: int = 8):
     """
     Extract the defined region of interest (ROI) from an aligned image.
 
@@ -284,17 +824,460 @@ def roi_extraction(aligned: np.ndarray, path: str, ROI_BOX: tuple[int, int, int,
 
     # 3) quality gates (simple examples)
     if cv2.Laplacian(cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY), cv2.CV_64F).var() < 20:
-        if path:
-            cv2.imwrite(os.path.join(path, "6_roi_blurry.jpg"), roi)
+        _debug.write(path, "6_roi_blurry.jpg", roi)
         return roi, score, "blurry"
     if score < 0.6:
-        if path:
-            cv2.imwrite(os.path.join(path, "6_roi_low_template_match.jpg"), roi)
+        _debug.write(path, "6_roi_low_template_match.jpg", roi)
         return roi, score, "low_template_match"
-    if path:
-            cv2.imwrite(os.path.join(path, "6_roi.jpg"), roi)
+    _debug.write(path, "6_roi.jpg", roi)
     return roi, score, "ok"
 
+def card_quad_valid(approx: np.ndarray, image_shape: tuple, CARD_DIM: tuple[int, int]) -> bool:
+    """
+    Check that a detected quadrilateral is plausibly the card: convex, covering at least CARD_MIN_AREA of the
+    photo and within CARD_ASPECT_TOLERANCE of the aspect ratio of CARD_DIM.
+
+    Args:
+        - approx (np.ndarray): Detected contour points.
+        - image_shape (tuple): Shape of the photo the points were detected in.
+        - CARD_DIM (tuple): Target card dimensions (width, height).
+
+    Returns:
+    - bool: Whether the quadrilateral can be used as the card outline.
+    """
+    if len(approx) != 4:
+        return False
+    quad = order_points(approx.reshape(4, 2).astype(np.float32))
+    if not cv2.isContourConvex(quad.reshape(-1, 1, 2)):
+        return False
+    height, width = image_shape[:2]
+    if cv2.contourArea(quad) < CARD_MIN_AREA * width * height:
+        return False
+    top, right, bottom, left = (np.linalg.norm(quad[(i + 1) % 4] - quad[i]) for i in range(4))
+    aspect = (top + bottom) / max(left + right, 1e-6)
+    return abs(aspect * CARD_DIM[1] / CARD_DIM[0] - 1) <= CARD_ASPECT_TOLERANCE
+
+def locate_card(image: np.ndarray, config: dict, path: str = '') -> tuple[np.ndarray | None, np.ndarray | None]:
+    """
+    Find the card in a photo, by its quadrilateral or, failing that, by ORB feature matching.
+
+    Args:
+        - image (np.ndarray): Decoded BGR card photo.
+        - config (dict): Defect configuration with 'dimensions' and optionally 'detection_max_side',
+          'refine_corners' and 'card_template'. With 'card_template', cards whose quadrilateral
+          is not found or fails card_quad_valid() are aligned by ORB feature matching against
+          that upright card image.
+        - path (str): Directory to save debug images, or '' for none.
+
+    Returns:
+    - tuple: (card corners, or None if found by feature matching; homography onto the card's
+      'dimensions', or None if the card was not found)
+    """
+    if path and _debug.mode != 'off':
+        # Detection finds its own edges on the (downscaled) copy; the full-resolution map is only a debug artifact
+        detect_edges(image, path)
+    approx = detect_contours(image, None, config.get('detection_max_side', 0), config.get('refine_corners', False))
+    dimensions = config.get('dimensions', (480, 680))
+    if card_quad_valid(approx, image.shape, dimensions):
+        draw_quad(image, approx, path)
+        return approx, card_homography(approx, dimensions)
+    if config.get('card_template'):
+        # Fall back to feature matching, e.g. for borderless, partly occluded or implausibly detected cards
+        M = orb_homography(image, config['card_template'], dimensions, config.get('detection_max_side', 0))
+        if M is not None:
+            return None, M
+    if len(approx) == 4:
+        # Without a better estimate keep the implausible quadrilateral; the ROI template match still screens it
+        draw_quad(image, approx, path)
+        return approx, card_homography(approx, dimensions)
+    return None, None
+
+def card_transform(located: tuple[np.ndarray | None, np.ndarray], source_dim: tuple[int, int], CARD_DIM: tuple[int, int]) -> np.ndarray:
+    """
+    Return the homography of a located card onto CARD_DIM, given the one locate_card() found onto `source_dim`.
+    """
+    corners, M = located
+    if corners is not None:
+        return card_homography(corners, CARD_DIM)
+    if tuple(CARD_DIM) == tuple(source_dim):
+        return M
+    scale = np.diag([(CARD_DIM[0] - 1) / (source_dim[0] - 1), (CARD_DIM[1] - 1) / (source_dim[1] - 1), 1.0])
+    return scale @ M
+
+def extract_roi(image: np.ndarray, M: np.ndarray, config: dict, path: str = '', search: int = 8) -> tuple[np.ndarray, float, str]:
+    """
+    Warp a located card and extract one defect's ROI.
+
+    Args:
+        - image (np.ndarray): Decoded BGR card photo.
+        - M (np.ndarray): Homography of the card onto the defect's 'dimensions'.
+        - config (dict): Defect configuration with 'dimensions', 'roi' and optionally 'roi_template' and
+          'warp' ('roi', the default, warps only the ROI and its search margin; 'full' warps the whole card).
+          The whole card is always warped when debug images are written for it.
+        - path (str): Directory to save debug images, or '' for none.
+        - search (int): NCC search radius in pixels.
+
+    Returns:
+    - tuple: (ROI, template match score, status) where status is 'ok', 'blurry' or 'low_template_match'.
+    """
+    dimensions = config.get('dimensions', (480, 680))
+    roi_box = config.get('roi', (40, 45, 60, 60))
+    roi_template = config.get('roi_template', DEFAULT_ROI_TEMPLATE)
+    if config.get('warp', 'roi') == 'full' or (path and _debug.mode != 'off'):
+        return roi_extraction(align_card(image, M, path, dimensions), path, roi_box, roi_template, search)
+    # Only the ROI and its search margin are ever read, so only they are warped
+    window = roi_window(roi_box, dimensions, search)
+    x, y, w, h = roi_box
+    return roi_extraction(warp_window(image, M, window), path, (x - window[0], y - window[1], w, h), roi_template, search)
+
+def process_image(image: np.ndarray, config: dict, path: str = '', search: int = 8) -> tuple[np.ndarray | None, float, str]:
+    """
+    Align one decoded card and extract its ROI.
+
+    Args:
+        - image (np.ndarray): Decoded BGR card photo.
+        - config (dict): Defect configuration, as taken by locate_card() and extract_roi().
+        - path (str): Directory to save debug images, or '' for none.
+        - search (int): NCC search radius in pixels.
+
+    Returns:
+    - tuple: (ROI or None, template match score, status) where status is 'ok', 'blurry',
+      'low_template_match' or 'no_corners' when the card was not found.
+    """
+    _, M = locate_card(image, config, path)
+    if M is None:
+        _debug.finish(path, "no_corners")
+        return None, 0.0, "no_corners"
+    roi, score, status = extract_roi(image, M, config, path, search)
+    _debug.finish(path, status)
+    return roi, score, status
+
+def process_image_multi(image: np.ndarray, configs: dict[str, dict], path: str = '', search: int = 8) -> dict[str, tuple[np.ndarray | None, float, str]]:
+    """
+    Locate one decoded card once and extract the ROI of every defect in `configs` from that single homography.
+
+    Card detection uses the settings of the first configuration; each defect
+    then gets the homography onto its own 'dimensions' and its own ROI warp.
+    Debug images of each defect go to a subdirectory of `path` named after it.
+
+    Args:
+        - image (np.ndarray): Decoded BGR card photo.
+        - configs (dict): Defect configurations keyed by defect name.
+        - path (str): Directory to save debug images, or '' for none.
+        - search (int): NCC search radius in pixels.
+
+    Returns:
+    - dict: (ROI or None, template match score, status) per defect, as returned by process_image().
+    """
+    if not configs:
+        return {}
+    primary = next(iter(configs.values()))
+    located = locate_card(image, primary, path)
+    if located[1] is None:
+        _debug.finish(path, "no_corners")
+        return {defect: (None, 0.0, "no_corners") for defect in configs}
+
+    results = {}
+    for defect, config in configs.items():
+        defect_path = os.path.join(path, defect) if path else ''
+        M = card_transform(located, primary.get('dimensions', (480, 680)), config.get('dimensions', (480, 680)))
+        results[defect] = extract_roi(image, M, config, defect_path, search)
+        _debug.finish(defect_path, results[defect][2])
+    _debug.finish(path, next((status for _, _, status in results.values() if status != "ok"), "ok"))
+    return results
+
+def _init_worker() -> None:
+    """
+    Keep each pool worker on one OpenCV thread so the processes do not oversubscribe the cores.
+    """
+    cv2.setNumThreads(1)
+
+def start_pool(workers: int | None = None) -> ProcessPoolExecutor:
+    """
+    Start the process pool process_batch() aligns cards on, or return the one already running.
+
+    Workers are spawned rather than forked, so they never inherit the threads and locks
+    of a TensorFlow runtime the parent has loaded, and they live for the rest of the run
+    instead of being started for every batch.
+
+    Args:
+        - workers (int): Number of worker processes. Defaults to the CPU count.
+
+    Returns:
+    - ProcessPoolExecutor: The running pool.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None and _pool_workers != workers:
+            _pool.shutdown()
+            _pool = None
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=_init_worker)
+            _pool_workers = workers
+        return _pool
+
+def stop_pool() -> None:
+    """
+    Shut down the process pool started by start_pool(), if any.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+def _process_shared(image_block: str, offset: int, shape: tuple, roi_block: str, slot: int, config: dict, path: str, debug_mode: str) -> tuple[bool, float, str]:
+    """
+    Process-pool worker: align the image stored at `offset` in `image_block` and write its ROI into `slot` of `roi_block`.
+
+    Workers write debug images synchronously: the parent already chose which cards get
+    debug output, and background writes would be lost when a worker exits.
+    """
+    worker_mode = 'failures' if debug_mode == 'failures' else 'all'
+    if _debug.mode != worker_mode:
+        configure_debug(worker_mode)
+    images = shared_memory.SharedMemory(name=image_block)
+    rois = shared_memory.SharedMemory(name=roi_block)
+    try:
+        image = np.ndarray(shape, dtype=np.uint8, buffer=images.buf, offset=offset)
+        roi, score, status = process_image(image, config, path)
+        del image
+        if roi is None:
+            return False, score, status
+        _, _, w, h = config.get('roi', (40, 45, 60, 60))
+        view = np.ndarray((h, w, 3), dtype=np.uint8, buffer=rois.buf, offset=slot * h * w * 3)
+        view[:] = roi if roi.shape[:2] == (h, w) else cv2.resize(roi, (w, h))
+        del view
+        return True, score, status
+    finally:
+        images.close()
+        rois.close()
+
+def shared_batches(images: list[np.ndarray], limit: int = SHARED_BATCH_BYTES) -> list[slice]:
+    """
+    Split a list of images into consecutive runs of at most `limit` bytes; an image larger than `limit` runs alone.
+    """
+    batches, start, size = [], 0, 0
+    for index, image in enumerate(images):
+        if index > start and size + image.nbytes > limit:
+            batches.append(slice(start, index))
+            start, size = index, 0
+        size += image.nbytes
+    if start < len(images):
+        batches.append(slice(start, len(images)))
+    return batches
+
+def process_batch(images: list[np.ndarray], config: dict, paths: list[str] | None = None, workers: int | None = None) -> list[tuple[np.ndarray | None, float, str]]:
+    """
+    Align a batch of cards and extract their ROIs on a process pool.
+
+    The decoded images are packed into a shared-memory block and every
+    worker writes its ROI into a preallocated slot of a second block, so only
+    offsets, scores and status strings are pickled between processes. Blocks
+    hold at most SHARED_BATCH_BYTES of images at a time, which keeps /dev/shm
+    use bounded (Docker gives containers 64 MB by default).
+
+    Args:
+        - images (list): Decoded BGR card photos.
+        - config (dict): Defect configuration with 'dimensions', 'roi' and optionally 'roi_template'.
+        - paths (list): Per-image debug directories; '' or None to skip debug output.
+        - workers (int): Number of worker processes, see start_pool().
+
+    Returns:
+    - list: (ROI or None, score, status) per image, in input order.
+    """
+    paths = paths or [''] * len(images)
+    results = []
+    for batch in shared_batches(images):
+        results += _process_shared_batch(images[batch], config, paths[batch], workers)
+    return results
+
+def _process_shared_batch(images: list[np.ndarray], config: dict, paths: list[str], workers: int | None) -> list[tuple[np.ndarray | None, float, str]]:
+    """
+    Align one shared-memory batch of process_batch().
+    """
+    _, _, w, h = config.get('roi', (40, 45, 60, 60))
+    offsets = np.cumsum([0] + [image.nbytes for image in images]).tolist()
+
+    image_block = shared_memory.SharedMemory(create=True, size=max(offsets[-1], 1))
+    roi_block = shared_memory.SharedMemory(create=True, size=len(images) * h * w * 3)
+    try:
+        for image, offset in zip(images, offsets):
+            np.ndarray(image.shape, dtype=np.uint8, buffer=image_block.buf, offset=offset)[:] = image
+
+        try:
+            outcomes = list(start_pool(workers).map(
+                _process_shared,
+                [image_block.name] * len(images), offsets[:-1], [image.shape for image in images],
+                [roi_block.name] * len(images), range(len(images)), [config] * len(images), paths,
+                [_debug.mode] * len(images)))
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool for the next batch
+            stop_pool()
+            raise
+
+        all_rois = np.ndarray((len(images), h, w, 3), dtype=np.uint8, buffer=roi_block.buf)
+        results = [(all_rois[slot].copy() if found else None, score, status) for slot, (found, score, status) in enumerate(outcomes)]
+        del all_rois
+        return results
+    finally:
+        image_block.close()
+        image_block.unlink()
+        roi_block.close()
+        roi_block.unlink()
+
+atexit.register(flush_debug)
+atexit.register(stop_pool)
+
+def dhash(img: cv2.typing.MatLike, size: int = DHASH_SIZE) -> int:
+    """
+    Compute the difference hash of an image: whether each pixel of a (size+1)xsize grey thumbnail is brighter than its left neighbour.
+
+    The hash survives rescaling and recompression, so relisted and reused photos hash within a few bits of each other.
+    The default 256-bit hash keeps distinct photos of similar cards well apart, which 64 bits do not.
+    """
+    factor = max(1, min(img.shape[:2]) // (32 * size))
+    if factor > 1:
+        # Integer factors keep INTER_AREA on its fast block-averaging path
+        img = cv2.resize(img, None, fx=1.0 / factor, fy=1.0 / factor, interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    thumbnail = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    return int.from_bytes(np.packbits(thumbnail[:, 1:] > thumbnail[:, :-1]).tobytes(), 'big')
+
+def hash_key(value: int) -> str:
+    """
+    Format a dHash as the fixed-width hex string used as its key in the duplicate index.
+    """
+    return f"{value:0{DHASH_SIZE * DHASH_SIZE // 4}x}"
+
+class BKTree:
+    """
+    Burkhard-Keller tree over integer hashes under the Hamming distance.
+
+    Each node keeps its children keyed by their distance to it, so a radius
+    search only descends into children whose key lies within the radius of
+    the distance to the query.
+    """
+    def __init__(self):
+        self.root: list | None = None
+
+    def add(self, value: int) -> None:
+        if self.root is None:
+            self.root = [value, {}]
+            return
+        node = self.root
+        while True:
+            distance = (node[0] ^ value).bit_count()
+            if distance == 0:
+                return
+            if distance not in node[1]:
+                node[1][distance] = [value, {}]
+                return
+            node = node[1][distance]
+
+    def nearest(self, value: int, radius: int, accept: Callable[[int], bool] | None = None) -> tuple[int, int] | None:
+        """
+        Return (distance, hash) of the closest stored hash within `radius` of `value`, or None.
+
+        With `accept`, only hashes it returns True for are considered, so a closer rejected
+        hash does not hide an accepted one.
+        """
+        best = None
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = (node[0] ^ value).bit_count()
+            if distance <= radius and (best is None or distance < best[0]) and (accept is None or accept(node[0])):
+                best = (distance, node[0])
+            stack.extend(child for key, child in node[1].items() if distance - radius <= key <= distance + radius)
+        return best
+
+class DuplicateIndex:
+    """
+    Persistent perceptual-hash index of already classified listing photos.
+
+    'index.json' maps the hex dHash of each photo to the verdict it received
+    and the registry key of the model that gave it. A photo within
+    `max_distance` bits of a known one is a relisting or a reused stock photo
+    and can reuse its verdict, as long as `model` is still the classifier in
+    use. Verdicts of other models are never matched or refreshed, so they
+    age out: when more than `max_entries` photos are known, the least
+    recently used are evicted on `flush`.
+    """
+    def __init__(self, directory: str, max_entries: int = DEDUP_MAX_ENTRIES, max_distance: int = DEDUP_MAX_DISTANCE, model: str = ''):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.model = model
+        self.index_path = os.path.join(directory, 'index.json')
+        self.lock = threading.Lock()
+        self.index: dict[str, dict] = rotom.read_json(self.index_path, {})
+        self.tree = BKTree()
+        for key in self.index:
+            self.tree.add(int(key, 16))
+
+    def lookup(self, value: int) -> tuple[str, dict] | None:
+        """
+        Return (hex hash, entry) of the nearest known photo within `max_distance` bits, marking it as recently used.
+
+        Photos classified by another model than `model`, or any photo while `model` is unknown, do not match.
+        """
+        with self.lock:
+            if not self.model:
+                return None
+            match = self.tree.nearest(value, self.max_distance, lambda candidate: self.index.get(hash_key(candidate), {}).get('model') == self.model)
+            if match is None:
+                return None
+            key = hash_key(match[1])
+            entry = self.index[key]
+            entry['accessed'] = time.time()
+            return key, entry
+
+    def add(self, value: int, verdict: dict) -> None:
+        """
+        Remember the verdict `model` gave a newly classified photo.
+        """
+        if not self.model:
+            return
+        with self.lock:
+            self.index[hash_key(value)] = {'verdict': verdict, 'model': self.model, 'accessed': time.time()}
+            self.tree.add(value)
+
+    def flush(self) -> None:
+        """
+        Merge the in-memory index with the one on disk, evict least recently used photos and persist it.
+        """
+        with rotom.file_lock(self.index_path), self.lock:
+            merged = rotom.read_json(self.index_path, {})
+            for key, entry in self.index.items():
+                if key not in merged or merged[key].get('accessed', 0) <= entry.get('accessed', 0):
+                    merged[key] = entry
+
+            evicted = sorted(merged, key=lambda key: merged[key].get('accessed', 0))[:max(0, len(merged) - self.max_entries)]
+            for key in evicted:
+                del merged[key]
+
+            if evicted or len(merged) != len(self.index):
+                self.tree = BKTree()
+                for key in merged:
+                    self.tree.add(int(key, 16))
+            self.index = merged
+            rotom.write_json_atomic(self.index_path, self.index)
+        if evicted:
+            rotom.print_with_color(f"Evicted {len(evicted)} photos from the duplicate index", 4)
+
+def get_duplicate_index(directory: str, max_entries: int = DEDUP_MAX_ENTRIES, max_distance: int = DEDUP_MAX_DISTANCE, model: str = '') -> DuplicateIndex:
+    """
+    Return the shared DuplicateIndex rooted at `directory`, serving the verdicts of the model registered as `model`.
+    """
+    directory = os.path.abspath(directory)
+    with _duplicate_indexes_lock:
+        if directory not in _duplicate_indexes:
+            _duplicate_indexes[directory] = DuplicateIndex(directory, max_entries, max_distance, model)
+        index = _duplicate_indexes[directory]
+        index.max_entries, index.max_distance, index.model = max_entries, max_distance, model
+        return index
+
 def main():
     args = {
         "title": "demo",
@@ -304,6 +1287,8 @@ def main():
         "roi": [40, 45, 60, 60]
     }
     image, path = load_file_from_directory(args.get('title', ''), args.get('input_dir', ''), args.get('debugging_dir', ''))
+    if image is None:
+        exit()
     image_edges = detect_edges(image, path)
     approx = detect_contours(image, image_edges)
     aligned = draw_contours(image, approx, path, args.get('dimensions', [480, 680]))
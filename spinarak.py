@@ -3,10 +3,14 @@
 eBay API crawler module for PokéPrint Inspector.
 
 This module handles:
-- Authenticating with the eBay API using OAuth2
-- Searching Pokémon card listings on eBay with specific queries
-- Downloading card images (attempting high-resolution first, falling back if needed)
-- Optionally saving images locally or returning them as byte content
+- Authenticating with the eBay API using OAuth2 (tokens cached in memory and on disk)
+- Searching Pokémon card listings on eBay with specific queries, fanning queries and pages out concurrently
+- Pacing search requests with an adaptive token-bucket rate limiter
+- Deduplicating listings returned by several overlapping queries
+- Crawling incrementally, stopping at per-query high-water marks of already-seen listings
+- Downloading card images at the smallest eBay size variant meeting the alignment target, falling back if needed
+- Bulk-downloading listing images over a shared, connection-pooled session, in order or streamed as they arrive
+- Caching images in a content-addressed on-disk store, revalidated with conditional GETs
 
 Dependencies:
 - requests
@@ -20,18 +24,196 @@ for defect detection.
 
 import requests
 import os
+import time
+import hashlib
+import re
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor, Future
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import rotom
 
-def get_ebay_token(client_id: str, client_secret: str) -> str:
+DOWNLOAD_TIMEOUT = 10.0
+DOWNLOAD_RETRIES = 2
+DOWNLOAD_WORKERS = 8
+# Every listing image is served from i.ebayimg.com, so the per-host cap is the effective concurrency
+DOWNLOADS_PER_HOST = DOWNLOAD_WORKERS
+
+EBAY_IMAGE_SIZES = (64, 96, 140, 225, 300, 400, 500, 640, 800, 960, 1200, 1600)
+EBAY_SIZE_PATTERN = re.compile(r's-l\d+(\.\w+)$')
+
+IMAGE_STORE_DIR = os.path.join(os.getcwd(), 'processes', 'image_store')
+IMAGE_STORE_MAX_BYTES = 512 * 1024 * 1024
+
+TOKEN_CACHE_PATH = os.path.join(os.getcwd(), 'processes', 'ebay_token.json')
+TOKEN_REFRESH_MARGIN = 300
+
+_token_cache: dict[str, dict] = {}
+_token_lock = threading.Lock()
+
+SEARCH_URL = 'https://api.ebay.com/buy/browse/v1/item_summary/search'
+SEARCH_PAGE_SIZE = 50
+SEARCH_WORKERS = 8
+SEARCH_RETRIES = 4
+SEARCH_TIMEOUT = 15.0
+
+CRAWL_STATE_PATH = os.path.join(os.getcwd(), 'processes', 'crawl_state.json')
+FULL_RESYNC_INTERVAL = 6 * 60 * 60
+HIGH_WATER_IDS = 200
+
+_session = None
+_api_session = None
+_session_lock = threading.Lock()
+_image_stores: dict[str, 'ImageStore'] = {}
+_host_slots: dict[tuple[str, int], threading.BoundedSemaphore] = {}
+_host_slots_lock = threading.Lock()
+
+def get_session(pool_size: int = DOWNLOAD_WORKERS, retries: int = DOWNLOAD_RETRIES) -> requests.Session:
+    """
+    Return the shared keep-alive session, creating it on first use.
+
+    Args:
+        - pool_size (int): Maximum number of pooled connections per host.
+        - retries (int): Retries for connection errors and 429/5xx responses.
+
+    Returns:
+    - requests.Session: Session reused by every request in this process.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=retries,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(['GET']),
+                respect_retry_after_header=True
+            )
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+            _session = requests.Session()
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+def get_api_session(pool_size: int = SEARCH_WORKERS) -> requests.Session:
     """
-    Fetch an OAuth2 access token from the eBay API using client credentials.
+    Return the shared keep-alive session used for eBay API calls.
+
+    Unlike `get_session`, it never retries on HTTP status codes, so 429 and
+    5xx responses reach the rate limiter instead of being retried blindly.
+
+    Args:
+        - pool_size (int): Maximum number of pooled connections per host.
+
+    Returns:
+    - requests.Session: Session reused by every API request in this process.
+    """
+    global _api_session
+    with _session_lock:
+        if _api_session is None:
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=Retry(total=2, backoff_factor=0.5))
+            _api_session = requests.Session()
+            _api_session.mount('https://', adapter)
+        return _api_session
+
+class RateLimiter:
+    """
+    Token bucket shared by every search request.
+
+    The refill rate follows the rate-limit headers returned by the API when
+    present, grows slowly while requests succeed, and is halved on 429/5xx
+    responses, honouring any Retry-After delay.
+    """
+    def __init__(self, rate: float = 5.0, burst: int = 5, min_rate: float = 0.2, max_rate: float = 20.0):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Block until a request may be sent.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def observe(self, response: requests.Response, attempt: int = 0) -> float:
+        """
+        Adapt the refill rate to a response.
+
+        Args:
+            - response (requests.Response): Response to a request sent after `acquire`.
+            - attempt (int): Zero-based retry attempt of that request.
+
+        Returns:
+        - float: Seconds to wait before retrying, or 0 if no retry is needed.
+        """
+        def header(*names: str) -> float | None:
+            for name in names:
+                try:
+                    return float(response.headers[name])
+                except (KeyError, ValueError):
+                    continue
+            return None
+
+        remaining = header('X-RateLimit-Remaining', 'X-EBAY-C-RATELIMIT-REMAINING')
+        reset = header('X-RateLimit-Reset', 'X-EBAY-C-RATELIMIT-RESET')
+        retry_after = header('Retry-After')
+
+        with self.lock:
+            now = time.monotonic()
+            if remaining is not None and reset:
+                self.rate = min(self.max_rate, max(self.min_rate, remaining / reset))
+            if response.status_code == 429 or response.status_code >= 500:
+                self.rate = max(self.min_rate, self.rate / 2)
+                delay = retry_after if retry_after is not None else min(30.0, 0.5 * 2 ** attempt)
+                self.blocked_until = max(self.blocked_until, now + delay)
+                return delay
+            if remaining is None:
+                self.rate = min(self.max_rate, self.rate + 0.1)
+            return 0.0
+
+_search_limiter = RateLimiter()
+
+def _host_slot(url: str, per_host: int) -> threading.BoundedSemaphore:
+    """
+    Return the semaphore limiting concurrent downloads from the host of `url` to `per_host`.
+
+    Semaphores are keyed by host and limit, so a call with a different limit gets its own
+    instead of silently inheriting the first one created for the host.
+    """
+    key = (urlparse(url).netloc, per_host)
+    with _host_slots_lock:
+        if key not in _host_slots:
+            _host_slots[key] = threading.BoundedSemaphore(per_host)
+        return _host_slots[key]
+
+def request_ebay_token(client_id: str, client_secret: str) -> dict:
+    """
+    Fetch a fresh OAuth2 access token from the eBay API using client credentials.
 
     Args:
         - client_id (str): eBay API client ID.
         - client_secret (str): eBay API client secret.
 
     Returns:
-    - str: Access token for authenticated API requests.
+    - dict: Token response holding 'access_token' and 'expires_in' (seconds).
     """
     url = 'https://api.ebay.com/identity/v1/oauth2/token'
     headers = {
@@ -47,108 +229,607 @@ def get_ebay_token(client_id: str, client_secret: str) -> str:
     if response.status_code != 200:
         rotom.print_with_color(f"Failed to retrieve token: {response.status_code} - {response.text}", 1)
     
-    return response.json()['access_token']
+    return response.json()
 
-def search_pokemon_cards(access_token: str, query: str = "Wartortle Pokemon Card", offset: int = 0, price: float = 50, limit: int = 100) -> dict:
+def get_ebay_token(client_id: str, client_secret: str, cache_path: str = TOKEN_CACHE_PATH, refresh_margin: float = TOKEN_REFRESH_MARGIN) -> str:
     """
-    Fetches up to `limit` Pokémon card listings from eBay, starting at `offset`, combining paginated results.
+    Return a valid eBay access token, reusing a cached one until shortly before it expires.
+
+    Tokens are cached in memory and in `cache_path`, so they survive process
+    restarts. Refreshes are serialised across threads and processes, and a
+    worker that waited on the lock reuses the token minted by the one that held it.
 
     Args:
-        - access_token (str): OAuth2 bearer token.
-        - query (str): Search query string.
-        - offset (int): Index to start fetching from.
-        - price (float): Maximum price filter.
-        - limit (int): Total number of listings to fetch.
+        - client_id (str): eBay API client ID.
+        - client_secret (str): eBay API client secret.
+        - cache_path (str): JSON file the token is persisted to. Empty to disable the disk cache.
+        - refresh_margin (float): Seconds before expiry at which the token is refreshed.
 
     Returns:
-    - dict: Combined eBay listings in a single JSON-like structure.
+    - str: Access token for authenticated API requests.
+    """
+    key = hashlib.sha256(client_id.encode()).hexdigest()
+
+    def fresh(entry: dict | None) -> bool:
+        return bool(entry) and entry.get('expires_at', 0) - refresh_margin > time.time()
+
+    with _token_lock:
+        if fresh(_token_cache.get(key)):
+            return _token_cache[key]['access_token']
+
+        if not cache_path:
+            response = request_ebay_token(client_id, client_secret)
+            _token_cache[key] = {
+                'access_token': response['access_token'],
+                'expires_at': time.time() + float(response.get('expires_in', 0))
+            }
+            return _token_cache[key]['access_token']
+
+        with rotom.file_lock(cache_path):
+            entry = rotom.read_json(cache_path, {}).get(key)
+            if not fresh(entry):
+                rotom.print_with_color("Refreshing eBay access token...", 4)
+                response = request_ebay_token(client_id, client_secret)
+                entry = {
+                    'access_token': response['access_token'],
+                    'expires_at': time.time() + float(response.get('expires_in', 0))
+                }
+                cached = rotom.read_json(cache_path, {})
+                cached[key] = entry
+                rotom.write_json_atomic(cache_path, cached, 0o600)
+            _token_cache[key] = entry
+        return entry['access_token']
+
+def _search_page(access_token: str, params: dict, limiter: RateLimiter, retries: int = SEARCH_RETRIES) -> list | None:
     """
+    Fetch a single page of search results, retrying on 429/5xx and network errors.
 
-    search_url = 'https://api.ebay.com/buy/browse/v1/item_summary/search'
+    Returns:
+    - list: The page's item summaries, or None if the page could not be fetched.
+    """
     headers = {
         'Authorization': f'Bearer {access_token}',
         'Content-Type': 'application/json',
         'X-EBAY-C-MARKETPLACE-ID': 'EBAY_US'
     }
+    session = get_api_session()
+    failure = ''
+    for attempt in range(retries + 1):
+        limiter.acquire()
+        try:
+            response = session.get(SEARCH_URL, headers=headers, params=params, timeout=SEARCH_TIMEOUT)
+        except requests.RequestException as e:
+            failure = str(e)
+            rotom.print_with_color(f"Search request for '{params['q']}' at offset {params['offset']} failed: {e}", 3)
+            time.sleep(min(30.0, 0.5 * 2 ** attempt))
+            continue
+
+        delay = limiter.observe(response, attempt)
+        if response.status_code == 200:
+            return response.json().get('itemSummaries', [])
+        failure = f"{response.status_code} - {response.text}"
+        if not delay:
+            break
+        rotom.print_with_color(f"Search for '{params['q']}' throttled ({response.status_code}), retrying in {delay:.1f}s...", 3)
+        time.sleep(delay)
 
-    all_items = []
-    page_size = 50
-    total_fetched = 0
+    rotom.print_with_color(f"Search failed at offset {params['offset']}: {failure}", 1, False)
+    return None
 
+def _page_params(query: str, price: float, page_offset: int, batch_limit: int) -> dict:
     condition_ids = "1000|3000|4000"
-    while total_fetched < limit:
-        batch_limit = min(page_size, limit - total_fetched)
-        params = {
-            'q': query,
-            'limit': str(batch_limit),
-            'offset': str(offset + total_fetched),
-            'sort': 'newlyListed',
-            'filter': f'conditionIds:{{{condition_ids}}},price:[0..{price}]'
-        }
-
-        response = requests.get(search_url, headers=headers, params=params)
-
-        if response.status_code != 200:
-            rotom.print_with_color(f"Search failed at offset {offset + total_fetched}: {response.status_code} - {response.text}", 1)
-            break
+    return {
+        'q': query,
+        'limit': str(batch_limit),
+        'offset': str(page_offset),
+        'sort': 'newlyListed',
+        'filter': f'conditionIds:{{{condition_ids}}},price:[0..{price}]'
+    }
 
-        data = response.json()
-        items = data.get('itemSummaries', [])
-        if not items:
-            break
+def crawl_key(query: str, price: float, scope: str = '') -> str:
+    """
+    Key of the high-water mark of a (query, price threshold) pair in the crawl state.
 
-        all_items.extend(items)
-        total_fetched += len(items)
+    `scope` separates consumers of the same pair, e.g. two tasks watching the
+    same defect at the same price, so one does not swallow the other's new listings.
+    """
+    return f"{scope}|{query}|{float(price):g}" if scope else f"{query}|{float(price):g}"
 
+def _crawl_incremental(access_token: str, query: str, offset: int, price: float, limit: int, limiter: RateLimiter, mark: dict) -> tuple[list, bool]:
+    """
+    Walk result pages newest first, stopping at the first listing at or below the high-water mark.
+
+    Returns:
+    - tuple: (new listings, True if every page needed was fetched successfully)
+    """
+    seen = set(mark.get('seen_ids', []))
+    newest = mark.get('newest', '')
+    all_items = []
+    for page_offset in range(offset, offset + limit, SEARCH_PAGE_SIZE):
+        batch_limit = min(SEARCH_PAGE_SIZE, offset + limit - page_offset)
+        items = _search_page(access_token, _page_params(query, price, page_offset, batch_limit), limiter)
+        if items is None:
+            return all_items, False
+        for item in items:
+            created = item.get('itemCreationDate', '')
+            if item.get('itemId', '') in seen or (newest and created and created < newest):
+                return all_items, True
+            all_items.append(item)
         if len(items) < batch_limit:
             break
+    return all_items, True
 
-        rotom.pause(0.25)
+def _advance_mark(mark: dict, items: list, full: bool) -> dict:
+    """
+    Return the high-water mark after a crawl that returned `items`, newest first.
+    """
+    dates = [item['itemCreationDate'] for item in items if item.get('itemCreationDate')]
+    ids = [item['itemId'] for item in items if item.get('itemId')]
+    return {
+        'newest': max(dates + [mark.get('newest', '')]),
+        'seen_ids': list(dict.fromkeys(ids + mark.get('seen_ids', [])))[:HIGH_WATER_IDS],
+        'last_full_sync': time.time() if full else mark.get('last_full_sync', 0)
+    }
+
+def search_queries(access_token: str, queries: list[str], offset: int = 0, price: float = 50, limit: int = 100, limiter: RateLimiter | None = None, max_workers: int = SEARCH_WORKERS, incremental: bool = False, full_resync: bool = False, state_path: str = CRAWL_STATE_PATH, full_resync_interval: float = FULL_RESYNC_INTERVAL, state_scope: str = '') -> dict[str, dict]:
+    """
+    Fetch up to `limit` listings for every query, requesting all queries and page offsets concurrently.
 
-    return {'itemSummaries': all_items}
+    In incremental mode each (query, price) pair keeps a high-water mark in
+    `state_path`: the newest listing time and the most recent itemIds seen.
+    Pages are then walked newest first and pagination stops at the first
+    already-seen listing, so only new listings are returned. A pair is fully
+    resynced when it has no mark, when its last full sync is older than
+    `full_resync_interval` seconds, or when `full_resync` is set.
 
+    Args:
+        - access_token (str): OAuth2 bearer token.
+        - queries (list): Search query strings.
+        - offset (int): Index to start fetching from.
+        - price (float): Maximum price filter.
+        - limit (int): Total number of listings to fetch per query.
+        - limiter (RateLimiter): Rate limiter to pace requests with. Defaults to the shared limiter.
+        - max_workers (int): Maximum number of requests in flight.
+        - incremental (bool): Only return listings newer than each query's high-water mark.
+        - full_resync (bool): Ignore the high-water marks for this crawl and rebuild them.
+        - state_path (str): JSON file holding the high-water marks.
+        - full_resync_interval (float): Seconds between periodic full resyncs in incremental mode.
+        - state_scope (str): Namespace of the high-water marks, e.g. a task id.
 
-def download_image(original_image_url: str, title: str, save_dir: str, save: bool = False) -> bytes:
+    Returns:
+    - dict: Query string mapped to its combined listings, {'itemSummaries': [...]}.
     """
-    Download an image from eBay and optionally save it locally.
+    limiter = limiter or _search_limiter
+    marks = rotom.read_json(state_path, {}) if incremental else {}
+    pages: dict[str, list[tuple[int, Future]]] = {}
+    crawls: dict[str, Future] = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for query in dict.fromkeys(queries):
+            mark = marks.get(crawl_key(query, price, state_scope))
+            if incremental and mark and not full_resync and time.time() - mark.get('last_full_sync', 0) < full_resync_interval:
+                crawls[query] = executor.submit(_crawl_incremental, access_token, query, offset, price, limit, limiter, mark)
+                continue
+            pages[query] = []
+            for page_offset in range(offset, offset + limit, SEARCH_PAGE_SIZE):
+                batch_limit = min(SEARCH_PAGE_SIZE, offset + limit - page_offset)
+                params = _page_params(query, price, page_offset, batch_limit)
+                pages[query].append((batch_limit, executor.submit(_search_page, access_token, params, limiter)))
+
+    results = {}
+    updates = {}
+    for query in dict.fromkeys(queries):
+        if query in crawls:
+            all_items, complete = crawls[query].result()
+            full = False
+        else:
+            all_items, complete, full = [], True, True
+            for batch_limit, future in pages[query]:
+                items = future.result()
+                if items is None:
+                    complete = False
+                if not items:
+                    break
+                all_items.extend(items)
+                if len(items) < batch_limit:
+                    break
+        results[query] = {'itemSummaries': all_items}
+        if incremental and complete:
+            key = crawl_key(query, price, state_scope)
+            updates[key] = _advance_mark(marks.get(key, {}), all_items, full)
+        if incremental:
+            rotom.print_with_color(f"{'Full' if full else 'Incremental'} crawl of '{query}' returned {len(all_items)} listings", 4)
+
+    if updates:
+        with rotom.file_lock(state_path):
+            state = rotom.read_json(state_path, {})
+            state.update(updates)
+            rotom.write_json_atomic(state_path, state)
+    return results
+
+def search_pokemon_cards(access_token: str, query: str = "Wartortle Pokemon Card", offset: int = 0, price: float = 50, limit: int = 100, limiter: RateLimiter | None = None) -> dict:
+    """
+    Fetches up to `limit` Pokémon card listings from eBay, starting at `offset`, combining paginated results.
+
+    Args:
+        - access_token (str): OAuth2 bearer token.
+        - query (str): Search query string.
+        - offset (int): Index to start fetching from.
+        - price (float): Maximum price filter.
+        - limit (int): Total number of listings to fetch.
+        - limiter (RateLimiter): Rate limiter to pace requests with. Defaults to the shared limiter.
+
+    Returns:
+    - dict: Combined eBay listings in a single JSON-like structure.
+    """
+    return search_queries(access_token, [query], offset, price, limit, limiter)[query]
+
+
+def listing_key(item: dict) -> str:
+    """
+    Identify a listing by its eBay itemId, falling back to its image URL.
+    """
+    return item.get('itemId', '') or item.get('image', {}).get('imageUrl', '')
+
+def deduplicate_listings(search_results: dict[str, dict], seen: set[str] | None = None) -> tuple[dict[str, dict], dict[str, int]]:
+    """
+    Merge the results of several queries, keeping each listing only the first time it appears.
+
+    Args:
+        - search_results (dict): Query string mapped to {'itemSummaries': [...]}, in query order.
+        - seen (set): Listing keys already handled in this run; updated in place.
+
+    Returns:
+    - tuple: (query mapped to its unique listings, query mapped to the number of duplicates dropped)
+    """
+    seen = set() if seen is None else seen
+    unique: dict[str, dict] = {}
+    dropped: dict[str, int] = {}
+    for query, results in search_results.items():
+        kept = []
+        dropped[query] = 0
+        for item in results.get('itemSummaries', []):
+            key = listing_key(item)
+            if key and key in seen:
+                dropped[query] += 1
+                continue
+            if key:
+                seen.add(key)
+            kept.append(item)
+        unique[query] = {**results, 'itemSummaries': kept}
+    return unique, dropped
+
+def image_size_chain(original_image_url: str, resolution: dict | None = None) -> list[str]:
+    """
+    Build the ordered list of image URLs to try for a listing image.
+
+    The chain starts with the smallest eBay size variant whose longest side is
+    at least `resolution['min_long_side']`, continues with the larger allowed
+    variants, and ends with the original URL. Without a policy, the 1600px
+    variant is tried before the original URL.
+
+    Args:
+        - original_image_url (str): URL of the eBay listing image, e.g. '.../s-l225.jpg'.
+        - resolution (dict): Policy with 'min_long_side' (int) and optional 'sizes' (list of ints).
+
+    Returns:
+    - list: Candidate URLs, most preferred first, without duplicates.
+    """
+    if not EBAY_SIZE_PATTERN.search(original_image_url):
+        return [original_image_url]
+    if not resolution:
+        sizes = [1600]
+    else:
+        allowed = sorted(resolution.get('sizes', EBAY_IMAGE_SIZES))
+        target = resolution.get('min_long_side', allowed[-1])
+        sizes = [size for size in allowed if size >= target] or allowed[-1:]
+    chain = [EBAY_SIZE_PATTERN.sub(rf's-l{size}\g<1>', original_image_url) for size in sizes]
+    return list(dict.fromkeys(chain + [original_image_url]))
+
+class ImageStore:
+    """
+    Content-addressed image cache shared by every crawl.
+
+    Image bytes live in 'objects/<sha256>.jpg', so identical photos are stored
+    once whatever their URL. 'index.json' maps each listing image URL to the
+    object it resolved to, the URL actually fetched and its ETag/Last-Modified
+    validators. When the stored objects exceed `max_bytes`, the least recently
+    used ones are evicted on `flush`.
+    """
+    def __init__(self, directory: str, max_bytes: int = IMAGE_STORE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, 'index.json')
+        self.lock = threading.Lock()
+        self.index: dict[str, dict] = rotom.read_json(self.index_path, {})
+        self.revalidated = 0
+        os.makedirs(os.path.join(directory, 'objects'), exist_ok=True)
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.directory, 'objects', f"{digest}.jpg")
+
+    def entry(self, url: str) -> dict | None:
+        """
+        Return the index entry of `url` if its object is still on disk.
+        """
+        with self.lock:
+            entry = self.index.get(url)
+        if entry and os.path.isfile(self.object_path(entry['sha256'])):
+            return entry
+        return None
+
+    def lookup(self, url: str) -> str:
+        """
+        Return the path of the stored image for `url`, or '' if it is not cached.
+        """
+        entry = self.entry(url)
+        return self.object_path(entry['sha256']) if entry else ''
+
+    def validators(self, url: str) -> dict:
+        """
+        Return conditional request headers for revalidating the cached copy of `url`.
+        """
+        entry = self.entry(url) or {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def read(self, url: str) -> bytes:
+        """
+        Return the stored bytes for `url` and mark them as recently used.
+        """
+        path = self.lookup(url)
+        if not path:
+            return b''
+        try:
+            with open(path, 'rb') as fp:
+                content = fp.read()
+        except OSError:
+            return b''
+        with self.lock:
+            if url in self.index:
+                self.index[url]['accessed'] = time.time()
+            self.revalidated += 1
+        return content
+
+    def put(self, url: str, source_url: str, content: bytes, etag: str | None = None, last_modified: str | None = None) -> str:
+        """
+        Store `content` for `url` and return the path of its object.
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.object_path(digest)
+        if not os.path.isfile(path):
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as fp:
+                fp.write(content)
+            os.replace(tmp_path, path)
+        with self.lock:
+            self.index[url] = {
+                'sha256': digest,
+                'source_url': source_url,
+                'etag': etag or '',
+                'last_modified': last_modified or '',
+                'size': len(content),
+                'accessed': time.time()
+            }
+        return path
+
+    def flush(self) -> None:
+        """
+        Merge the in-memory index with the one on disk, evict least recently used objects and persist it.
+        """
+        with rotom.file_lock(self.index_path), self.lock:
+            merged = rotom.read_json(self.index_path, {})
+            for url, entry in self.index.items():
+                if url not in merged or merged[url].get('accessed', 0) <= entry.get('accessed', 0):
+                    merged[url] = entry
+
+            objects: dict[str, tuple[float, int]] = {}
+            for entry in merged.values():
+                accessed, size = objects.get(entry['sha256'], (0.0, entry.get('size', 0)))
+                objects[entry['sha256']] = (max(accessed, entry.get('accessed', 0)), size)
+
+            total = sum(size for _, size in objects.values())
+            evicted = set()
+            for digest, (_, size) in sorted(objects.items(), key=lambda pair: pair[1][0]):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(self.object_path(digest))
+                except FileNotFoundError:
+                    pass
+                evicted.add(digest)
+                total -= size
+
+            self.index = {url: entry for url, entry in merged.items() if entry['sha256'] not in evicted}
+            rotom.write_json_atomic(self.index_path, self.index)
+        if evicted:
+            rotom.print_with_color(f"Evicted {len(evicted)} images from the image store", 4)
+
+def get_image_store(directory: str = IMAGE_STORE_DIR) -> ImageStore:
+    """
+    Return the shared ImageStore rooted at `directory`.
+    """
+    directory = os.path.abspath(directory or IMAGE_STORE_DIR)
+    with _session_lock:
+        if directory not in _image_stores:
+            _image_stores[directory] = ImageStore(directory)
+        return _image_stores[directory]
+
+def lookup_image(image_url: str, store_dir: str = IMAGE_STORE_DIR) -> str:
+    """
+    Find the locally stored copy of a listing image.
+
+    Args:
+        - image_url (str): URL of the eBay listing image.
+        - store_dir (str): Root directory of the image store.
+
+    Returns:
+    - str: Path to the stored image, or '' if it has not been downloaded.
+    """
+    return get_image_store(store_dir).lookup(image_url)
+
+def download_image(original_image_url: str, title: str, save_dir: str, save: bool = False, session: requests.Session | None = None, timeout: float = DOWNLOAD_TIMEOUT, store: ImageStore | None = None, resolution: dict | None = None) -> bytes:
+    """
+    Download an image from eBay through the image store.
+
+    A previously stored image is revalidated with If-None-Match/If-Modified-Since,
+    so an unchanged image costs a 304 instead of a full download.
 
     Args:
         - original_image_url (str): URL of the eBay listing image.
-        - title (str): Listing title (used for filename if saving).
-        - save_dir (str): Directory path to save the image.
-        - save (bool): If True, saves the image to disk; otherwise returns byte content.
+        - title (str): Listing title (used in log messages).
+        - save_dir (str): Directory path of the image store to save into when `save` is set.
+        - save (bool): If True, stores the image under `save_dir`; otherwise under IMAGE_STORE_DIR.
+        - session (requests.Session): Session to fetch with. Defaults to the shared session.
+        - timeout (float): Per-request timeout in seconds.
+        - store (ImageStore): Store to use; when given, the caller is responsible for flushing it.
+        - resolution (dict): Resolution policy passed to `image_size_chain`.
 
     Returns:
-    - bytes: Image content as raw bytes.
+    - bytes: Image content as raw bytes; empty if the download failed.
     """
-    image_url = ""
-    try:
-        # Try fetching high-resolution version first
-        image_url = original_image_url.replace("s-l225.jpg", "s-l1600.jpg")
-        response = requests.get(image_url)
-        if response.status_code != 200:
-            raise Exception("Fallback to low-res!")
-    except:
-        image_url = original_image_url  # fallback to original URL
-        rotom.print_with_color("Unable to fetch high-quality image. Falling back...", 3)
+    session = session or get_session()
+    own_store = store is None
+    store = store or get_image_store(save_dir if save else IMAGE_STORE_DIR)
+
+    # One request per image: the preferred size, then larger ones only if it is missing
+    candidates = image_size_chain(original_image_url, resolution)
+    cached = store.entry(original_image_url)
+    if cached and cached['source_url'] in candidates:
+        candidates.remove(cached['source_url'])
+        candidates.insert(0, cached['source_url'])
+
+    content = b''
+    for image_url in candidates:
+        headers = store.validators(original_image_url) if cached and cached['source_url'] == image_url else {}
+        try:
+            response = session.get(image_url, headers=headers, timeout=timeout)
+            if response.status_code == 304:
+                content = store.read(original_image_url)
+                if content:
+                    break
+                response = session.get(image_url, timeout=timeout)
+        except requests.RequestException as e:
+            rotom.print_with_color(f"Unable to fetch {image_url}: {e}", 3)
+            continue
+        if response.status_code == 200 and response.content:
+            content = response.content
+            path = store.put(original_image_url, image_url, content, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            if save:
+                rotom.print_with_color(f"Saved: {path}", 2)
+            break
+        if image_url != candidates[-1]:
+            rotom.print_with_color(f"Unable to fetch {image_url}. Falling back...", 3)
 
-    response = requests.get(image_url)
+    if not content:
+        rotom.print_with_color(f"Failed to download image for '{title}': {original_image_url}", 3)
+    if own_store:
+        store.flush()
+    return content
 
-    if save:
-        os.makedirs(save_dir, exist_ok=True)
+def _summarise_downloads(sizes: list[int], elapsed: float, revalidated: int, stats: dict | None) -> None:
+    """
+    Log download throughput and copy the figures into `stats` when given.
+    """
+    elapsed = max(elapsed, 1e-9)
+    downloaded = sum(1 for size in sizes if size)
+    total_bytes = sum(sizes)
+    summary = {
+        'images': downloaded,
+        'failed': len(sizes) - downloaded,
+        'revalidated': revalidated,
+        'bytes': total_bytes,
+        'seconds': elapsed,
+        'images_per_second': downloaded / elapsed,
+        'bytes_per_second': total_bytes / elapsed
+    }
+    if stats is not None:
+        stats.update(summary)
+    rotom.print_with_color(
+        f"Downloaded {downloaded}/{len(sizes)} images ({revalidated} unchanged, {total_bytes / 1e6:.2f} MB) in {elapsed:.2f}s: "
+        f"{summary['images_per_second']:.1f} images/s, {summary['bytes_per_second'] / 1e6:.2f} MB/s", 4)
 
-        # Sanitize filename
-        filename = f"{title[:40].replace(' ', '_').replace('/', '-')}.jpg"
-        filepath = os.path.join(save_dir, filename)
+def download_images(cards: list[dict], save_dir: str = '', save: bool = False, max_workers: int = DOWNLOAD_WORKERS, per_host: int = DOWNLOADS_PER_HOST, timeout: float = DOWNLOAD_TIMEOUT, retries: int = DOWNLOAD_RETRIES, stats: dict | None = None, resolution: dict | None = None) -> list[bytes]:
+    """
+    Download the images of many listings concurrently over a shared keep-alive session.
 
-        if response.status_code == 200:
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
-            rotom.print_with_color(f"Saved: {filepath}", 2)
-        else:
-            rotom.print_with_color(f"Failed to download image: {image_url}", 1)
+    Args:
+        - cards (list): Card dictionaries holding 'image_url' and 'title'.
+        - save_dir (str): Directory path of the image store to save into when `save` is set.
+        - save (bool): If True, stores the images under `save_dir`; otherwise under IMAGE_STORE_DIR.
+        - max_workers (int): Size of the download worker pool.
+        - per_host (int): Maximum concurrent downloads from a single host; as all listing images share
+          one host, this also caps `max_workers`.
+        - timeout (float): Per-request timeout in seconds.
+        - retries (int): Retries for connection errors and 429/5xx responses.
+        - stats (dict): Optional dictionary filled with throughput figures.
+        - resolution (dict): Resolution policy passed to `image_size_chain`.
 
-    return response.content
+    Returns:
+    - list: Image bytes in the same order as `cards`; b'' where a download failed.
+    """
+    session = get_session(max(max_workers, per_host), retries)
+    store = get_image_store(save_dir if save else IMAGE_STORE_DIR)
+    revalidated = store.revalidated
+
+    def fetch(card: dict) -> bytes:
+        url = card.get('image_url', '')
+        if not url:
+            return b''
+        with _host_slot(url, per_host):
+            return download_image(url, card.get('title', ''), save_dir, save, session, timeout, store, resolution)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        contents = list(executor.map(fetch, cards))
+    elapsed = time.perf_counter() - start
+    store.flush()
+
+    _summarise_downloads([len(content) for content in contents], elapsed, store.revalidated - revalidated, stats)
+    return contents
+
+def stream_images(cards: list[dict], output: queue.Queue, save_dir: str = '', save: bool = False, max_workers: int = DOWNLOAD_WORKERS, per_host: int = DOWNLOADS_PER_HOST, timeout: float = DOWNLOAD_TIMEOUT, retries: int = DOWNLOAD_RETRIES, stats: dict | None = None, resolution: dict | None = None, stop: threading.Event | None = None) -> None:
+    """
+    Download the images of many listings concurrently, handing each one on as soon as it arrives.
+
+    Every finished download is put on `output` as (index into `cards`, bytes),
+    with b'' for failed downloads. Workers block while `output` is full, so a
+    bounded queue caps how many downloaded images are held in memory.
+
+    Args:
+        - cards (list): Card dictionaries holding 'image_url' and 'title'.
+        - output (queue.Queue): Queue receiving (index, bytes) tuples in completion order.
+        - stop (threading.Event): Once set, downloads that have not started are skipped and not put on `output`.
+        - Remaining arguments are as for `download_images`.
+    """
+    session = get_session(max(max_workers, per_host), retries)
+    store = get_image_store(save_dir if save else IMAGE_STORE_DIR)
+    revalidated = store.revalidated
+    sizes = [0] * len(cards)
+
+    def fetch(index: int) -> None:
+        if stop is not None and stop.is_set():
+            return
+        card = cards[index]
+        url = card.get('image_url', '')
+        content = b''
+        if url:
+            with _host_slot(url, per_host):
+                content = download_image(url, card.get('title', ''), save_dir, save, session, timeout, store, resolution)
+        sizes[index] = len(content)
+        output.put((index, content))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(fetch, range(len(cards))))
+    elapsed = time.perf_counter() - start
+    store.flush()
+
+    _summarise_downloads(sizes, elapsed, store.revalidated - revalidated, stats)
 
 def main():
     args = {
@@ -167,14 +848,15 @@ def main():
     token = get_ebay_token(CLIENT_ID, CLIENT_SECRET)
 
     items = []
+    cards = []
 
     queries = args.get('queries', [])
 
-    for query in queries:
-        rotom.print_with_color(f"Searching for Pokémon card listings '{query}'...", 4)
-        results = search_pokemon_cards(token, price=threshold, query=query)
+    rotom.print_with_color(f"Searching for Pokémon card listings {', '.join(repr(query) for query in queries)}...", 4)
+    search_results, duplicates = deduplicate_listings(search_queries(token, list(queries), price=threshold))
 
-        rotom.print_with_color("Downloading listing images...", 4)
+    for query, results in search_results.items():
+        rotom.print_with_color(f"Found {len(results.get('itemSummaries', []))} new listings for '{query}' ({duplicates.get(query, 0)} duplicates dropped)", 4)
 
         for item in results.get('itemSummaries', []):
             card = {
@@ -182,13 +864,20 @@ def main():
                 'product_url': item.get('itemWebUrl', ''),
                 'image_url': item.get('image', {}).get('imageUrl', '')
             }
-        
+
             if card['image_url']:
-                card['image'] = bytearray(download_image(card['image_url'], card['title'], args.get('input_dir', ''), USE_LOCAL_STORAGE))
-                items.append(card)
+                cards.append(card)
                 continue
             rotom.print_with_color(f"No image found for: {card['title']}", 3)
-            
+
+    rotom.print_with_color("Downloading listing images...", 4)
+    contents = download_images(cards, args.get('input_dir', ''), USE_LOCAL_STORAGE)
+    for card, content in zip(cards, contents):
+        if not content:
+            rotom.print_with_color(f"No image downloaded for: {card['title']}", 3)
+            continue
+        card['image'] = bytearray(content)
+        items.append(card)
 
     rotom.print_with_color("Listed Images have been downloaded! 🥳", 2)
 